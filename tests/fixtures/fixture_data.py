@@ -5,6 +5,15 @@ from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
 
 
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache():
+    """Свой кеш на прогон, а не общий кеш сервера."""
+
+    from core.runner import isolated_caches
+    with isolated_caches():
+        yield
+
+
 @pytest.fixture()
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
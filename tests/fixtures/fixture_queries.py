@@ -0,0 +1,96 @@
+import pytest
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+# Максимальное число SQL-запросов на представление из posts/urls.py.
+# Бюджет не должен зависеть от объёма данных: N+1 сразу его превысит.
+# Страницы с Last-Modified на пустом кеше делают ещё один запрос:
+# Max(updated) постов ленты (см. posts/feed_cache.py).
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:search': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:add_comment': 6,
+    'posts:follow_index': 4,
+    'posts:profile_follow': 12,
+    'posts:profile_unfollow': 12,
+}
+
+LARGE_AUTHORS = 10
+LARGE_POSTS = 60
+LARGE_COMMENTS = 120
+
+
+@pytest.fixture
+def large_dataset(mixer, user, django_user_model):
+    """Несколько авторов и групп, много постов, подписок и комментариев."""
+
+    groups = mixer.cycle(3).blend(Group)
+    authors = [
+        django_user_model.objects.create_user(username=f'author{i}')
+        for i in range(LARGE_AUTHORS)
+    ]
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+
+    posts = [
+        Post.objects.create(
+            text=f'Пост {i}',
+            author=authors[i % LARGE_AUTHORS],
+            group=groups[i % len(groups)],
+        )
+        for i in range(LARGE_POSTS)
+    ]
+    hot_post = posts[-1]
+    for i in range(LARGE_COMMENTS):
+        Comment.objects.create(
+            post=hot_post,
+            author=authors[i % LARGE_AUTHORS],
+            text=f'Комментарий {i}',
+        )
+
+    return {
+        'user': user,
+        'author': authors[0],
+        'group': groups[0],
+        'post': hot_post,
+        'own_post': Post.objects.create(text='Свой пост', author=user),
+    }
+
+
+@pytest.fixture
+def assert_query_budget(django_assert_max_num_queries):
+    """Проверяет, что блок уложился в бюджет запросов представления."""
+
+    def check(url_name):
+        assert url_name in QUERY_BUDGETS, (
+            f'Задайте бюджет запросов для `{url_name}` в QUERY_BUDGETS'
+        )
+        return django_assert_max_num_queries(QUERY_BUDGETS[url_name])
+
+    return check
+
+
+def view_url(url_name, data):
+    """URL представления с аргументами из large_dataset."""
+
+    kwargs = {
+        'posts:group_list': {'slug': data['group'].slug},
+        'posts:profile': {'username': data['author'].username},
+        'posts:post_detail': {'post_id': data['post'].pk},
+        'posts:post_edit': {'post_id': data['own_post'].pk},
+        'posts:add_comment': {'post_id': data['post'].pk},
+        'posts:profile_follow': {'username': data['author'].username},
+        'posts:profile_unfollow': {'username': data['author'].username},
+    }
+    query = {
+        'posts:search': '?q=пост',
+    }
+    return reverse(url_name, kwargs=kwargs.get(url_name)) + query.get(
+        url_name, ''
+    )
@@ -0,0 +1,34 @@
+import pytest
+from django.core.cache import cache
+
+from posts.urls import app_name, urlpatterns
+from tests.fixtures.fixture_queries import QUERY_BUDGETS, view_url
+
+pytestmark = [pytest.mark.django_db]
+
+URL_NAMES = [f'{app_name}:{pattern.name}' for pattern in urlpatterns]
+POST_VIEWS = {'posts:add_comment'}
+
+
+def test_every_view_has_budget():
+    missing = set(URL_NAMES) - set(QUERY_BUDGETS)
+    assert not missing, (
+        f'Задайте бюджет запросов в QUERY_BUDGETS для: {", ".join(missing)}'
+    )
+
+
+@pytest.mark.parametrize('url_name', URL_NAMES)
+def test_view_query_budget(url_name, user_client, large_dataset,
+                           assert_query_budget):
+    cache.clear()
+    url = view_url(url_name, large_dataset)
+
+    with assert_query_budget(url_name):
+        if url_name in POST_VIEWS:
+            response = user_client.post(url, {'text': 'Комментарий'})
+        else:
+            response = user_client.get(url)
+
+    assert response.status_code in (200, 302), (
+        f'Страница `{url}` вернула {response.status_code}'
+    )
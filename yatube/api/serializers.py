@@ -0,0 +1,51 @@
+"""Компактное JSON-представление постов и комментариев."""
+
+from posts import thumbnails, variants
+
+
+def author_data(user):
+    return {
+        'username': user.username,
+        'name': user.get_full_name(),
+    }
+
+
+def group_data(group):
+    if group is None:
+        return None
+    return {
+        'slug': group.slug,
+        'title': group.title,
+    }
+
+
+def image_data(post):
+    if not post.image:
+        return None
+    return {
+        'url': post.image.url,
+        'thumbnail': thumbnails.thumbnail_url(post.image),
+        'sources': variants.sources(post),
+    }
+
+
+def post_data(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': post.created,
+        'updated': post.updated,
+        'author': author_data(post.author),
+        'group': group_data(post.group),
+        'image': image_data(post),
+        'comments_count': post.comments_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'created': comment.created,
+        'author': author_data(comment.author),
+    }
@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='testslug',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Первый пост',
+            author=self.author,
+            group=self.group,
+        )
+
+    def test_feeds(self):
+        """Ленты отдают компактный JSON с постами"""
+
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+
+                self.assertEqual(response['Content-Type'], 'application/json')
+                data = response.json()
+                self.assertIsNone(data['next'])
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertEqual(data['results'][0]['group'], {
+                    'slug': 'testslug',
+                    'title': 'Тестовая группа',
+                })
+
+    def test_not_modified(self):
+        """Неизменная лента отдаёт 304 без запросов к базе"""
+
+        url = reverse('api:index')
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(text='Второй пост', author=self.reader)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(POSTS_AMOUNT=1)
+    def test_cursor_pagination(self):
+        second = Post.objects.create(text='Второй пост', author=self.author)
+
+        data = self.client.get(reverse('api:index')).json()
+        self.assertEqual([post['id'] for post in data['results']], [second.pk])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            [self.post.pk],
+        )
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+        data = self.client.get(reverse('api:index'), {'limit': 100}).json()
+        self.assertEqual(len(data['results']), 2)
+
+    def test_post_detail(self):
+        """Новый комментарий меняет ETag поста"""
+
+        url = reverse('api:post_detail', args=(self.post.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comments']['results'], [])
+
+        Comment.objects.create(
+            post=self.post,
+            author=self.reader,
+            text='Комментарий',
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments']['results'][0]['text'], 'Комментарий')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(reverse('api:post_detail', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed(self):
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(response.json()['results'][0]['id'], self.post.pk)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
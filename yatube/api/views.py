@@ -0,0 +1,151 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+
+from posts import feed_cache
+from posts.conditional import (feed_validators, make_etag, not_modified,
+                               set_validators)
+from posts.models import Group, Post, User
+from posts.paginator_custom import CURSOR_PARAM, CursorPaginator
+from posts.timeline import timeline_posts
+
+from .serializers import comment_data, post_data
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    response = JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+    # Клиент может хранить ответ, но обязан перепроверить его
+    # условным запросом.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_AMOUNT))
+    except ValueError:
+        return settings.POSTS_AMOUNT
+    return min(max(limit, 1), settings.API_MAX_LIMIT)
+
+
+def page_url(request, token, param=CURSOR_PARAM):
+    if token is None:
+        return None
+    query = request.GET.copy()
+    query[param] = token
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def paginate(request, queryset, per_page, param=CURSOR_PARAM, **kwargs):
+    paginator = CursorPaginator(queryset, per_page, **kwargs)
+    page = paginator.get_page(request.GET.get(param))
+    links = {
+        'next': page_url(request, paginator.next_cursor, param),
+        'previous': page_url(request, paginator.previous_cursor, param),
+    }
+    return page, links
+
+
+def feed(request, name, posts):
+    """Страница ленты posts с валидаторами поколения name."""
+
+    etag, last_modified = feed_validators(name, posts)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    page, links = paginate(request, posts, page_size(request))
+    response = json_response({
+        'results': [post_data(post) for post in page],
+        **links,
+    })
+    return set_validators(response, etag, last_modified)
+
+
+def index(request):
+    posts = Post.objects.select_related('author', 'group')
+    return feed(request, feed_cache.INDEX, posts)
+
+
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.select_related('author', 'group')
+    return feed(request, feed_cache.scope('group', group.pk), posts)
+
+
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    posts = author.posts.select_related('author', 'group')
+    return feed(request, feed_cache.scope('author', author.pk), posts)
+
+
+def post_detail(request, post_id):
+    # Любое изменение поста и его комментариев сдвигает поколение
+    # ленты автора, поэтому валидаторы считаются без выборки поста.
+    author_id = get_object_or_404(
+        Post.objects.values_list('author_id', flat=True),
+        pk=post_id,
+    )
+    etag, last_modified = feed_validators(
+        feed_cache.scope('author', author_id),
+        Post.objects.filter(author_id=author_id),
+        post_id,
+    )
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=post_id,
+    )
+    comments, links = paginate(
+        request,
+        post.comments.select_related('author'),
+        settings.COMMENTS_AMOUNT,
+        param='comments',
+        descending=False,
+    )
+    response = json_response({
+        **post_data(post),
+        'comments': {
+            'results': [comment_data(comment) for comment in comments],
+            **links,
+        },
+    })
+    return set_validators(response, etag, last_modified)
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response({'detail': 'Требуется авторизация'}, status=401)
+
+    # Ленту подписок меняют посты многих авторов, общего поколения
+    # у неё нет: ETag считается по выбранной странице, но без
+    # сериализации и поиска миниатюр.
+    page, links = paginate(
+        request,
+        timeline_posts(request.user),
+        page_size(request),
+        key='feed_created',
+    )
+    etag = make_etag(
+        'follow',
+        request.user.pk,
+        *(f'{post.pk}.{post.updated.timestamp()}.{post.comments_count}'
+          for post in page),
+        links['next'],
+    )
+    response = not_modified(request, etag)
+    if response is None:
+        response = json_response({
+            'results': [post_data(post) for post in page],
+            **links,
+        })
+        set_validators(response, etag)
+
+    patch_cache_control(response, private=True)
+    return response
@@ -0,0 +1,75 @@
+"""Бэкенды шаблонов и кеша, отчитывающиеся в core.metrics.
+
+Пока сбор метрик не включён (core.metrics.current() is None),
+они ведут себя как стандартные.
+"""
+
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import metrics
+
+MISSING = object()
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = metrics.current()
+        # Вложенный рендеринг (render_to_string в тегах) уже учтён
+        # во внешнем.
+        if stats is None or stats.rendering:
+            return super().render(context, request)
+
+        stats.rendering = True
+        db_seconds = stats.db_seconds
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.template_seconds += elapsed - (stats.db_seconds - db_seconds)
+            stats.rendering = False
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(
+                self.engine.get_template(template_name), self,
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class CacheMetricsMixin:
+    """Считает попадания и промахи get и get_many."""
+
+    batch = False
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if not self.batch:
+            hit = value is not MISSING
+            metrics.count_cache(int(hit), int(not hit))
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # Базовый get_many вызывает get - не считаем ключи дважды.
+        self.batch = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            self.batch = False
+        metrics.count_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
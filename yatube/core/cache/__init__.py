@@ -0,0 +1,13 @@
+"""Кеш, общий для всех процессов сервера.
+
+tiered.TwoTierCache - небольшой LRU в памяти процесса (L1) перед
+общим хранилищем (L2). Хранилища L2:
+
+sqlite.SQLiteCache  файл SQLite, общий для процессов одной машины,
+                    по умолчанию в XDG_RUNTIME_DIR;
+resp.RespCache      сервер с протоколом Redis; для разработки и
+                    тестов его заменяет manage.py cache_server
+                    (server.RespServer).
+
+Настройки собирает yatube/caches.py из CACHE_URL.
+"""
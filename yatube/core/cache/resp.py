@@ -0,0 +1,202 @@
+"""Кеш на сервере с протоколом Redis (RESP).
+
+LOCATION - redis://хост:порт/номер_базы. Целые числа хранятся
+строкой, чтобы работал INCRBY, остальные значения - pickle.
+clear() выполняет FLUSHDB: кешу нужна своя база сервера.
+"""
+
+import pickle
+import socket
+import threading
+from urllib.parse import urlsplit
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_PORT = 6379
+SOCKET_TIMEOUT = 5
+
+
+class RespError(Exception):
+    pass
+
+
+def encode(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('Сервер кеша закрыл соединение')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode()
+    if kind == b'-':
+        raise RespError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        return stream.read(length + 2)[:-2]
+    if kind == b'*':
+        length = int(rest)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RespError(f'Непонятный ответ сервера: {line!r}')
+
+
+def dump(value):
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def load(value):
+    if value is None:
+        return None
+    # pickle протокола 2+ начинается с b'\x80'.
+    if value[:1] == b'\x80':
+        return pickle.loads(value)
+    return int(value)
+
+
+class RespCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        parts = urlsplit(location)
+        self.address = (
+            parts.hostname or 'localhost', parts.port or DEFAULT_PORT,
+        )
+        self.db = int(parts.path.strip('/') or 0)
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, SOCKET_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.socket = sock
+        self._local.stream = sock.makefile('rb')
+        if self.db:
+            self._pipeline([('SELECT', self.db)])
+
+    def _pipeline(self, commands):
+        """Отправляет команды одним пакетом и читает ответы."""
+
+        if getattr(self._local, 'socket', None) is None:
+            self._connect()
+        try:
+            self._local.socket.sendall(
+                b''.join(encode(*command) for command in commands)
+            )
+            replies = [read_reply(self._local.stream) for _ in commands]
+        except (OSError, ConnectionError):
+            # Следующая команда откроет новое соединение.
+            self.close()
+            raise
+        return replies
+
+    def _command(self, *args):
+        return self._pipeline([args])[0]
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def _expiry(self, timeout):
+        """Аргументы SET для времени жизни; None - ключ не нужен."""
+
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        if timeout <= 0:
+            return None
+        return ('PX', int(timeout * 1000))
+
+    def get(self, key, default=None, version=None):
+        value = self._command('GET', self._key(key, version))
+        return default if value is None else load(value)
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        if not names:
+            return {}
+        values = self._command('MGET', *names)
+        return {
+            names[key]: load(value)
+            for key, value in zip(names, values)
+            if value is not None
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            self.delete_many(data, version)
+            return []
+        if data:
+            self._pipeline([
+                ('SET', self._key(key, version), dump(value), *expiry)
+                for key, value in data.items()
+            ])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return not self.has_key(key, version)
+        return self._command(
+            'SET', self._key(key, version), dump(value), *expiry, 'NX',
+        ) is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # INCRBY создал бы отсутствующий ключ.
+        if not self._command('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            return self._command('INCRBY', key, delta)
+        except RespError as error:
+            raise ValueError(str(error))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self._command('DEL', key))
+        if not expiry:
+            return bool(
+                self._command('PERSIST', key) or self._command('EXISTS', key)
+            )
+        return bool(self._command('PEXPIRE', key, expiry[1]))
+
+    def has_key(self, key, version=None):
+        return bool(self._command('EXISTS', self._key(key, version)))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._command('DEL', *keys)
+
+    def clear(self):
+        self._command('FLUSHDB')
+
+    def close(self, **kwargs):
+        sock = getattr(self._local, 'socket', None)
+        if sock is not None:
+            self._local.stream.close()
+            sock.close()
+            self._local.socket = None
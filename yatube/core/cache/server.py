@@ -0,0 +1,152 @@
+"""Сервер с протоколом Redis для разработки и тестов.
+
+Понимает только команды, которые нужны resp.RespCache, и хранит
+данные в памяти своего процесса: все процессы сайта, подключённые
+к нему, видят один кеш. В продакшене вместо него - настоящий Redis.
+"""
+
+import socketserver
+import threading
+import time
+
+from .resp import RespError, read_reply
+
+
+def reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RespError):
+        return b'-ERR %s\r\n' % str(value).encode()
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(map(reply, value))
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class Storage:
+    """Базы сервера: {номер: {ключ: (значение, истекает)}}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+
+    def execute(self, db, name, args):
+        handler = getattr(self, 'command_' + name.lower(), None)
+        if handler is None:
+            return RespError(f"unknown command '{name}'")
+        with self.lock:
+            data = self.databases.setdefault(db, {})
+            try:
+                return handler(data, *args)
+            except (TypeError, ValueError):
+                return RespError(f"wrong arguments for '{name}'")
+
+    @staticmethod
+    def alive(data, key):
+        entry = data.get(key)
+        if entry is not None and entry[1] is not None:
+            if entry[1] <= time.monotonic():
+                del data[key]
+                return None
+        return entry
+
+    def command_ping(self, data):
+        return 'PONG'
+
+    def command_get(self, data, key):
+        entry = self.alive(data, key)
+        return entry and entry[0]
+
+    def command_mget(self, data, *keys):
+        return [self.command_get(data, key) for key in keys]
+
+    def command_set(self, data, key, value, *options):
+        expires = None
+        options = [option.upper() for option in options]
+        for unit, scale in ((b'PX', 1000), (b'EX', 1)):
+            if unit in options:
+                position = options.index(unit) + 1
+                expires = time.monotonic() + int(options[position]) / scale
+        exists = self.alive(data, key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        data[key] = (value, expires)
+        return 'OK'
+
+    def command_del(self, data, *keys):
+        return sum(data.pop(key, None) is not None for key in keys)
+
+    def command_exists(self, data, *keys):
+        return sum(self.alive(data, key) is not None for key in keys)
+
+    def command_incrby(self, data, key, delta):
+        entry = self.alive(data, key)
+        value, expires = entry or (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            return RespError('value is not an integer or out of range')
+        data[key] = (str(value).encode(), expires)
+        return value
+
+    def command_incr(self, data, key):
+        return self.command_incrby(data, key, b'1')
+
+    def command_pexpire(self, data, key, milliseconds):
+        entry = self.alive(data, key)
+        if entry is None:
+            return 0
+        data[key] = (entry[0], time.monotonic() + int(milliseconds) / 1000)
+        return 1
+
+    def command_persist(self, data, key):
+        entry = self.alive(data, key)
+        if entry is None or entry[1] is None:
+            return 0
+        data[key] = (entry[0], None)
+        return 1
+
+    def command_dbsize(self, data):
+        return len(data)
+
+    def command_flushdb(self, data):
+        data.clear()
+        return 'OK'
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        db = 0
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            name = command[0].decode().upper()
+            if name == 'QUIT':
+                self.wfile.write(reply('OK'))
+                return
+            if name == 'SELECT':
+                db = int(command[1])
+                result = 'OK'
+            else:
+                result = self.server.storage.execute(db, name, command[1:])
+            self.wfile.write(reply(result))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 6379)):
+        super().__init__(address, Handler)
+        self.storage = Storage()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке (для тестов)."""
+
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
@@ -0,0 +1,228 @@
+"""Кеш в файле SQLite, общий для процессов одной машины.
+
+Целые числа хранятся как INTEGER, поэтому incr атомарен и не
+требует чтения значения; остальные значения - pickle. Просроченные
+записи не отдаются и удаляются при очистке (раз в CULL_EVERY
+записей), тогда же лишнее сверх MAX_ENTRIES вытесняется начиная
+с ближайших к истечению.
+
+В файле лежат pickle: кто может его записать, тот выполнит свой
+код в процессе сервера, а прочитать - узнает сессии. Поэтому файл
+создаётся с правами 0600, а чужой файл или каталог, открытый
+на запись другим, не принимаются (ImproperlyConfigured).
+"""
+
+import os
+import pickle
+import sqlite3
+import stat
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+# SQLite ограничивает число параметров запроса.
+CHUNK_SIZE = 500
+CULL_EVERY = 100
+
+
+def dump(value):
+    return value if type(value) is int else pickle.dumps(
+        value, pickle.HIGHEST_PROTOCOL,
+    )
+
+
+def load(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+def check_private(path, info):
+    if info.st_uid != os.getuid():
+        raise ImproperlyConfigured(
+            f'Кеш {path} принадлежит другому пользователю'
+        )
+    if stat.S_ISDIR(info.st_mode) and info.st_mode & 0o022:
+        raise ImproperlyConfigured(
+            f'В каталог кеша {path} могут писать другие пользователи'
+        )
+
+
+def create_private(path):
+    """Создаёт файл кеша (и каталог) только для своего пользователя."""
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, 0o700, exist_ok=True)
+    check_private(directory, os.stat(directory))
+    descriptor = os.open(
+        path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600,
+    )
+    try:
+        info = os.fstat(descriptor)
+        check_private(path, info)
+        if info.st_mode & 0o077:
+            os.fchmod(descriptor, 0o600)
+    finally:
+        os.close(descriptor)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Журналы -wal и -shm SQLite создаёт с правами файла.
+            create_private(self.path)
+            connection = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Кеш можно потерять при сбое - fsync не нужен.
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self.connection.execute(
+            f'SELECT value FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else load(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        now = time.time()
+        chunk = list(names)
+        for start in range(0, len(chunk), CHUNK_SIZE):
+            part = chunk[start:start + CHUNK_SIZE]
+            rows = self.connection.execute(
+                'SELECT key, value FROM cache WHERE key IN '
+                f'({",".join("?" * len(part))}) AND {ALIVE}',
+                (*part, now),
+            )
+            for key, value in rows:
+                found[names[key]] = load(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [
+            (self._key(key, version), dump(value), expires)
+            for key, value in data.items()
+        ]
+        if expires is not None and expires <= time.time():
+            self.delete_many(data, version)
+            return []
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            rows,
+        )
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        # Просроченная запись не мешает добавить новую.
+        self.connection.execute(
+            f'DELETE FROM cache WHERE key = ? AND NOT {ALIVE}',
+            (key, time.time()),
+        )
+        added = self.connection.execute(
+            'INSERT OR IGNORE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, dump(value), self._expires(timeout)),
+        ).rowcount == 1
+        if added:
+            self._written(1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            updated = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                f"AND typeof(value) = 'integer' AND {ALIVE}",
+                (delta, key, time.time()),
+            ).rowcount
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,),
+            ).fetchone()
+        finally:
+            connection.execute('COMMIT')
+        if not updated:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.connection.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        self.connection.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys],
+        )
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def _written(self, count):
+        self._writes += count
+        if self._writes >= CULL_EVERY:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        connection = self.connection
+        connection.execute(
+            f'DELETE FROM cache WHERE NOT {ALIVE}', (time.time(),),
+        )
+        total = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if total <= self._max_entries:
+            return
+        extra = total - self._max_entries
+        if self._cull_frequency:
+            extra = max(extra, total // self._cull_frequency)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (extra,),
+        )
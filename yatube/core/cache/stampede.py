@@ -0,0 +1,122 @@
+"""Пересчёт закешированного значения без лавины запросов.
+
+Когда популярный ключ истекает (или меняется поколение ленты),
+все одновременные запросы промахиваются и пересчитывают одно и то
+же. Здесь значение хранится как Entry - вместе со сроком свежести
+и временем своего вычисления:
+
+- свежее значение отдаётся, но чем ближе срок и чем дольше значение
+  считается, тем вероятнее запрос пересчитает его заранее
+  (вероятностное раннее обновление, XFetch, STAMPEDE_BETA);
+- пересчитывает только взявший блокировку (single-flight), остальные
+  тем временем получают устаревшее значение: оно хранится ещё
+  STAMPEDE_STALE_TTL секунд после срока, а при смене ключа
+  устаревшим служит последнее значение по stale_key;
+- если устаревшего нет, запрос ждёт пересчитывающего не дольше
+  STAMPEDE_WAIT секунд и потом считает сам.
+"""
+
+import math
+import random
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..backends import MISSING
+
+LOCK_KEY = 'stampede:lock:{}'
+# Как часто ожидающий проверяет, не готово ли значение, секунды.
+POLL_INTERVAL = 0.05
+
+Entry = namedtuple('Entry', 'value delta expires')
+
+
+def fresh(entry, now=None):
+    """Свежо ли значение; около срока - с вероятностью, растущей
+    с временем вычисления delta."""
+
+    now = time.time() if now is None else now
+    jitter = entry.delta * settings.STAMPEDE_BETA * math.log(
+        1 - random.random()
+    )
+    return now - jitter < entry.expires
+
+
+def peek(key):
+    """Свежее значение без пересчёта или MISSING."""
+
+    entry = cache.get(key)
+    if entry is not None and entry.expires > time.time():
+        return entry.value
+    return MISSING
+
+
+def wait(key):
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry.value
+    return MISSING
+
+
+def lookup(key, stale_key=None):
+    """Пара (значение, пересчитывать ли).
+
+    Пересчитывать (True) - вызывающий получил блокировку и должен
+    вызвать store() или release(). Значение MISSING без блокировки -
+    пересчитывающий не успел: можно считать самому, но не сохранять
+    (store() сняла бы чужую блокировку).
+    """
+
+    entries = cache.get_many([key, stale_key] if stale_key else [key])
+    entry = entries.get(key)
+    if entry is not None and fresh(entry):
+        return entry.value, False
+
+    if cache.add(LOCK_KEY.format(key), 1, settings.STAMPEDE_LOCK_TIMEOUT):
+        return MISSING, True
+    if entry is None:
+        entry = entries.get(stale_key)
+    if entry is not None:
+        return entry.value, False
+    return wait(key), False
+
+
+def store(key, value, timeout, delta, stale_key=None):
+    """Сохраняет пересчитанное значение и снимает блокировку."""
+
+    entry = Entry(value, delta, time.time() + timeout)
+    data = {key: entry}
+    if stale_key:
+        data[stale_key] = entry
+    cache.set_many(data, timeout + settings.STAMPEDE_STALE_TTL)
+    release(key)
+
+
+def release(key):
+    cache.delete(LOCK_KEY.format(key))
+
+
+def get_or_compute(key, compute, timeout, stale_key=None):
+    """Значение по ключу; compute() вызывается, только если нужно
+    пересчитать."""
+
+    value, recompute = lookup(key, stale_key)
+    if value is not MISSING:
+        return value
+
+    started = time.perf_counter()
+    try:
+        value = compute()
+    except Exception:
+        if recompute:
+            release(key)
+        raise
+    if recompute:
+        # Не дождавшийся пересчитывающего не трогает его блокировку.
+        store(key, value, timeout, time.perf_counter() - started, stale_key)
+    return value
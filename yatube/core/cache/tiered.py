@@ -0,0 +1,296 @@
+"""Двухуровневый кеш: LRU процесса (L1) перед общим хранилищем (L2).
+
+OPTIONS:
+    L2                 настройки общего хранилища в формате CACHES
+                       (BACKEND, LOCATION, OPTIONS)
+    L1_MAX_ENTRIES     размер LRU; 0 - без L1
+    L1_TIMEOUT         сколько секунд значение живёт в L1
+    L1_CHECK_INTERVAL  как часто сверять значение из L1 с L2, секунды
+
+Запись кладёт в L2 рядом со значением случайную метку (STAMP_KEY).
+Значение из L1 отдаётся без обращения к L2, пока со сверки прошло
+меньше L1_CHECK_INTERVAL секунд; затем читается только метка,
+и если другой процесс её сменил, значение перечитывается. Целые
+числа (incr) сверяются по самому значению. Чужие изменения видны
+не позже чем через L1_CHECK_INTERVAL секунд, свои - сразу; запись
+одного ключа не сбрасывает остальные. L1 общий для потоков
+процесса, как и LocMemCache.
+
+Попадания и промахи каждого уровня считаются в core.metrics.
+"""
+
+import pickle
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .. import metrics
+from ..backends import MISSING, CacheMetricsMixin
+
+STAMP_KEY = ':tiered:stamp:{}'
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+# stamp - метка записи в L2, None для целых чисел; checked - время
+# последней сверки с L2 (time.monotonic).
+Entry = namedtuple('Entry', 'value stamp checked')
+
+
+def is_counter(value):
+    return type(value) is int
+
+
+def same_counter(value, current):
+    return is_counter(current) and current == value
+
+
+class LRU:
+    """L1: значения с временем истечения, вытесняются давно
+    не читанные. Как и LocMemCache, хранит копии (pickle): изменение
+    полученного объекта не меняет кеш."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return MISSING
+            value, stamp, checked, expires = item
+            if expires <= time.monotonic():
+                del self.data[key]
+                return MISSING
+            self.data.move_to_end(key)
+        return Entry(pickle.loads(value), stamp, checked)
+
+    def set(self, key, value, stamp, timeout):
+        if not self.max_entries:
+            return
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.monotonic()
+        with self.lock:
+            self.data[key] = [value, stamp, now, now + timeout]
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def confirm(self, key):
+        """Отмечает, что значение совпало с L2."""
+
+        with self.lock:
+            item = self.data.get(key)
+            if item is not None:
+                item[2] = time.monotonic()
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def get_store(name, max_entries):
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = _stores[name] = LRU(max_entries)
+        return store
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        l2 = options['L2']
+        self.l2 = import_string(l2['BACKEND'])(l2.get('LOCATION', ''), {
+            **l2,
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'KEY_PREFIX': self.key_prefix,
+            'VERSION': self.version,
+            'KEY_FUNCTION': params.get('KEY_FUNCTION'),
+        })
+        self.l1_timeout = options.get('L1_TIMEOUT', 30)
+        self.check_interval = options.get('L1_CHECK_INTERVAL', 1)
+        self.l1 = get_store(
+            location or l2.get('LOCATION', ''),
+            options.get('L1_MAX_ENTRIES', 1000),
+        )
+
+    def _l1_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def _l1_key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def _from_l1(self, keys, version):
+        """Значения, сверенные с L2 недавно, и записи L1, которые
+        пора сверить."""
+
+        found = {}
+        stale = {}
+        now = time.monotonic()
+        for key in keys:
+            entry = self.l1.get(self._l1_key(key, version))
+            if entry is MISSING:
+                continue
+            if now - entry.checked < self.check_interval:
+                found[key] = entry.value
+            else:
+                stale[key] = entry
+        return found, stale
+
+    def _confirm(self, stale, version):
+        """Записи L1, не изменившиеся в L2; одним запросом к L2."""
+
+        names = [
+            key if entry.stamp is None else STAMP_KEY.format(key)
+            for key, entry in stale.items()
+        ]
+        current = self.l2.get_many(names, version)
+        confirmed = {}
+        for (key, entry), name in zip(stale.items(), names):
+            value = current.get(name, MISSING)
+            l1_key = self._l1_key(key, version)
+            if entry.stamp is not None and value == entry.stamp:
+                self.l1.confirm(l1_key)
+                confirmed[key] = entry.value
+            elif entry.stamp is None and is_counter(value):
+                # У счётчика прочитано само значение, возможно новое.
+                if not same_counter(entry.value, value):
+                    self.l1.set(l1_key, value, None, self.l1_timeout)
+                else:
+                    self.l1.confirm(l1_key)
+                confirmed[key] = value
+        return confirmed
+
+    def _from_l2(self, keys, version):
+        """Значения из L2 вместе с метками; кладёт их в L1."""
+
+        stamps = [STAMP_KEY.format(key) for key in keys]
+        loaded = self.l2.get_many([*keys, *stamps], version)
+        found = {}
+        for key, stamp_key in zip(keys, stamps):
+            value = loaded.get(key, MISSING)
+            if value is MISSING:
+                continue
+            found[key] = value
+            stamp = None if is_counter(value) else loaded.get(stamp_key)
+            # Без метки значение нельзя будет сверить - в L1 его нет.
+            if stamp is not None or is_counter(value):
+                self.l1.set(
+                    self._l1_key(key, version), value, stamp,
+                    self.l1_timeout,
+                )
+        metrics.count_cache_tier('l2', len(found), len(keys) - len(found))
+        return found
+
+    def get(self, key, default=None, version=None):
+        return self._read([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        return self._read(list(keys), version)
+
+    def _read(self, keys, version):
+        found, stale = self._from_l1(keys, version)
+        if stale:
+            found.update(self._confirm(stale, version))
+        metrics.count_cache_tier('l1', len(found), len(keys) - len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            found.update(self._from_l2(missing, version))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        stamps = {key: secrets.token_hex(8) for key in data}
+        stamped = {}
+        for key, value in data.items():
+            # Метка пишется после значения: прочитавший новую метку
+            # прочитает и новое значение.
+            stamped[key] = value
+            stamped[STAMP_KEY.format(key)] = stamps[key]
+        self.l2.set_many(stamped, timeout, version)
+        l1_timeout = self._l1_timeout(timeout)
+        for key, value in data.items():
+            l1_key = self._l1_key(key, version)
+            if l1_timeout > 0:
+                stamp = None if is_counter(value) else stamps[key]
+                self.l1.set(l1_key, value, stamp, l1_timeout)
+            else:
+                self.l1.delete(l1_key)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version)
+        l1_key = self._l1_key(key, version)
+        if added:
+            stamp = secrets.token_hex(8)
+            self.l2.set(STAMP_KEY.format(key), stamp, timeout, version)
+            if is_counter(value):
+                stamp = None
+            self.l1.set(l1_key, value, stamp, self._l1_timeout(timeout))
+        else:
+            # Значение уже есть в L2 - возможно, не то, что в L1.
+            self.l1.delete(l1_key)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        l1_key = self._l1_key(key, version)
+        try:
+            value = self.l2.incr(key, delta, version)
+        except ValueError:
+            self.l1.delete(l1_key)
+            raise
+        self.l1.set(l1_key, value, None, self.l1_timeout)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.touch(STAMP_KEY.format(key), timeout, version)
+        return self.l2.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        found, _ = self._from_l1([key], version)
+        if found:
+            return True
+        return self.l2.has_key(key, version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l2.delete_many(
+            [*keys, *(STAMP_KEY.format(key) for key in keys)], version,
+        )
+        for key in keys:
+            self.l1.delete(self._l1_key(key, version))
+
+    def clear(self):
+        self.l2.clear()
+        self.l1.clear()
+
+    def close(self, **kwargs):
+        # Подключение к L2 переживает запрос.
+        pass
+
+
+class TwoTierCache(CacheMetricsMixin, TieredCache):
+    pass
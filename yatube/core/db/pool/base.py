@@ -0,0 +1,99 @@
+"""PostgreSQL с пулом подключений psycopg2.
+
+Django закрывает подключение в конце запроса (CONN_MAX_AGE = 0),
+а этот бэкенд вместо закрытия возвращает его в общий пул процесса,
+поэтому новый запрос не платит за установку соединения. Пул
+задаётся в DATABASES[...]['POOL'] (см. yatube/database.py):
+
+    MIN_SIZE  сколько подключений держать открытыми
+    MAX_SIZE  сколько подключений процесс открывает одновременно
+    TIMEOUT   сколько секунд ждать свободного подключения, если
+              все MAX_SIZE заняты; потом - OperationalError
+
+Каждый поток, обрабатывающий запрос, держит одно подключение
+на базу, поэтому MAX_SIZE стоит задать не меньше числа потоков
+процесса (gunicorn --threads): иначе лишние запросы ждут. Всего
+подключений к серверу - число процессов на MAX_SIZE, это должно
+укладываться в max_connections PostgreSQL.
+"""
+
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import OperationalError, pool
+
+DEFAULT_TIMEOUT = 30
+
+_pools = {}
+_slots = {}
+_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        with _lock:
+            connections = _pools.get(self.alias)
+            if connections is None:
+                options = self.settings_dict.get('POOL', {})
+                connections = _pools[self.alias] = pool.ThreadedConnectionPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    **conn_params,
+                )
+                # getconn() сразу бросает PoolError, когда все
+                # подключения заняты, - очередь держит семафор.
+                _slots[self.alias] = threading.BoundedSemaphore(
+                    options.get('MAX_SIZE', 10)
+                )
+        return connections
+
+    def get_new_connection(self, conn_params):
+        connections = self.get_pool(conn_params)
+        timeout = self.settings_dict.get('POOL', {}).get(
+            'TIMEOUT', DEFAULT_TIMEOUT,
+        )
+        if not _slots[self.alias].acquire(timeout=timeout):
+            raise OperationalError(
+                f'Нет свободного подключения к базе за {timeout} с'
+            )
+        connection = None
+        try:
+            connection = self.take(connections)
+            self.configure(connection)
+        except BaseException:
+            if connection is not None:
+                connections.putconn(connection, close=True)
+            _slots[self.alias].release()
+            raise
+        return connection
+
+    def configure(self, connection):
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+    def take(self, connections):
+        connection = connections.getconn()
+        if connection.closed:
+            # Сервер разорвал соединение, пока оно лежало в пуле.
+            connections.putconn(connection, close=True)
+            connection = connections.getconn()
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # Незавершённую транзакцию пул откатит сам.
+            try:
+                _pools[self.alias].putconn(
+                    self.connection,
+                    close=bool(self.connection.closed),
+                )
+            finally:
+                _slots[self.alias].release()
@@ -0,0 +1,229 @@
+"""Метрики запросов по представлениям.
+
+MetricsMiddleware (core/middleware.py) при METRICS_ENABLED собирает
+для каждого запроса RequestStats: число и время SQL-запросов, время
+рендеринга шаблонов без учёта запросов из них и попадания в кеш
+(у двухуровневого кеша - ещё и по каждому уровню).
+Итоги складываются в гистограммы REGISTRY с меткой представления.
+Данные живут в памяти процесса: каждый процесс сервера отдаёт свои.
+"""
+
+import threading
+import time
+
+# Границы корзин гистограмм: секунды и число SQL-запросов.
+SECONDS_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'request_seconds': ('Время ответа', SECONDS_BUCKETS),
+    'db_queries': ('SQL-запросов за ответ', QUERY_BUCKETS),
+    'db_seconds': ('Время SQL-запросов за ответ', SECONDS_BUCKETS),
+    'template_seconds': (
+        'Время рендеринга шаблонов без SQL-запросов',
+        SECONDS_BUCKETS,
+    ),
+}
+COUNTERS = {
+    'cache_hits': 'Попадания в кеш',
+    'cache_misses': 'Промахи кеша',
+    # Уровни core.cache.tiered: LRU процесса и общее хранилище.
+    'cache_l1_hits': 'Попадания в кеш процесса (L1)',
+    'cache_l1_misses': 'Промахи кеша процесса (L1)',
+    'cache_l2_hits': 'Попадания в общий кеш (L2)',
+    'cache_l2_misses': 'Промахи общего кеша (L2)',
+}
+# Доли попаданий в сводке: префикс счётчиков *_hits и *_misses.
+HIT_RATIOS = ('cache', 'cache_l1', 'cache_l2')
+PREFIX = 'yatube_'
+
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for number, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[number] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Пары (граница, число наблюдений не больше неё)."""
+
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """Оценка квантиля: верхняя граница корзины, куда он попал."""
+
+        if not self.count:
+            return None
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound
+        return float('inf')
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: {} for name in HISTOGRAMS}
+            self.counters = {name: {} for name in COUNTERS}
+
+    def record(self, view, stats, elapsed):
+        values = {
+            'request_seconds': elapsed,
+            'db_queries': stats.queries,
+            'db_seconds': stats.db_seconds,
+            'template_seconds': stats.template_seconds,
+        }
+        with self.lock:
+            for name, value in values.items():
+                views = self.histograms[name]
+                if view not in views:
+                    views[view] = Histogram(HISTOGRAMS[name][1])
+                views[view].observe(value)
+            for name in COUNTERS:
+                views = self.counters[name]
+                views[view] = views.get(view, 0) + getattr(stats, name)
+
+    def snapshot(self):
+        """Сводка по представлениям для JSON."""
+
+        with self.lock:
+            views = {}
+            for name, histograms in self.histograms.items():
+                for view, histogram in histograms.items():
+                    views.setdefault(view, {})[name] = {
+                        'count': histogram.count,
+                        'mean': histogram.sum / histogram.count,
+                        'p50': json_bound(histogram.quantile(0.5)),
+                        'p99': json_bound(histogram.quantile(0.99)),
+                    }
+            for name, counters in self.counters.items():
+                for view, value in counters.items():
+                    views.setdefault(view, {})[name] = value
+
+        for summary in views.values():
+            for name in HIT_RATIOS:
+                hits = summary[f'{name}_hits']
+                lookups = hits + summary[f'{name}_misses']
+                summary[f'{name}_hit_ratio'] = (
+                    hits / lookups if lookups else None
+                )
+        return views
+
+    def prometheus(self):
+        """Текстовый формат Prometheus 0.0.4."""
+
+        lines = []
+        with self.lock:
+            for name, histograms in self.histograms.items():
+                metric = PREFIX + name
+                lines.append(f'# HELP {metric} {HISTOGRAMS[name][0]}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histogram in sorted(histograms.items()):
+                    label = f'view="{escape(view)}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{bound}"}} {total}'
+                        )
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="+Inf"}} '
+                        f'{histogram.count}'
+                    )
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{metric}_count{{{label}}} {histogram.count}'
+                    )
+            for name, counters in self.counters.items():
+                metric = f'{PREFIX}{name}_total'
+                lines.append(f'# HELP {metric} {COUNTERS[name]}')
+                lines.append(f'# TYPE {metric} counter')
+                for view, value in sorted(counters.items()):
+                    lines.append(f'{metric}{{view="{escape(view)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def json_bound(value):
+    """Граница для JSON: бесконечность там недопустима, как в Prometheus
+    пишем её строкой +Inf."""
+
+    return '+Inf' if value == float('inf') else value
+
+
+def escape(value):
+    return (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    )
+
+
+REGISTRY = Registry()
+
+
+class RequestStats:
+    """Счётчики одного запроса; сам объект - обёртка выполнения SQL
+    для connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0
+        self.template_seconds = 0
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+def current():
+    """RequestStats текущего запроса или None, если сбор выключен."""
+
+    return getattr(_local, 'stats', None)
+
+
+def activate(stats):
+    _local.stats = stats
+
+
+def deactivate():
+    _local.stats = None
+
+
+def count_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def count_cache_tier(tier, hits, misses):
+    """Попадания и промахи одного уровня кеша: 'l1' или 'l2'."""
+
+    stats = current()
+    if stats is not None:
+        for kind, count in (('hits', hits), ('misses', misses)):
+            name = f'cache_{tier}_{kind}'
+            setattr(stats, name, getattr(stats, name) + count)
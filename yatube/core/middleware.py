@@ -0,0 +1,257 @@
+"""Кеш страниц для анонимов, метрики, трассировка SQL и выбор реплик.
+
+Ответы представлений из PAGE_CACHE_VIEWS хранятся целиком по пути
+с параметрами. Ключ включает поколение общей ленты (posts/feed_cache.py),
+которое сдвигается при любом изменении постов и комментариев, поэтому
+правки видны сразу, а PAGE_CACHE_TIMEOUT ограничивает устаревание
+прочих данных. Вошедшим пользователям страницы из
+PAGE_CACHE_PERSONAL_VIEWS отдаются из того же кеша с перерендеренными
+фрагментами {% personal %}, остальные страницы рендерятся заново.
+Страницу пересчитывает один запрос, остальные тем временем получают
+прошлую версию (core/cache/stampede.py).
+"""
+
+import contextlib
+import hashlib
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import parse_http_date_safe
+
+from posts import feed_cache
+
+from . import metrics, routers
+from .backends import MISSING
+from .cache import stampede
+from .querytrace import QueryTracer
+from .templatetags.personal import render_fragment
+
+KEY = 'page:{}:{}'
+STALE_KEY = 'page:latest:{}'
+WRITTEN_KEY = 'db:written:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PERSONAL_RE = re.compile(r'<!--personal (.*?)-->.*?<!--/personal-->', re.S)
+# Заголовки ответа для анонима, которые нельзя отдавать пользователю.
+ANONYMOUS_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+
+def page_keys(request):
+    """Ключ страницы и ключ её последней версии из любого поколения."""
+
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return (
+        KEY.format(feed_cache.generation(feed_cache.INDEX), path),
+        STALE_KEY.format(path),
+    )
+
+
+def personalize(content, request):
+    def render(match):
+        spec = json.loads(match.group(1))
+        return render_fragment(spec['template'], spec['extra'], request)
+
+    return PERSONAL_RE.sub(render, content.decode()).encode()
+
+
+class AnonymousPageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        keys = getattr(request, '_page_cache_keys', None)
+        if keys is None:
+            return response
+        key, stale_key, started = keys
+        if self.storable(request, response):
+            cached = (
+                response.status_code,
+                response.content,
+                list(response.items()),
+            )
+            stampede.store(
+                key,
+                cached,
+                settings.PAGE_CACHE_TIMEOUT,
+                time.perf_counter() - started,
+                stale_key,
+            )
+            response['X-Page-Cache'] = 'miss'
+        else:
+            stampede.release(key)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        view_name = request.resolver_match.view_name
+        if view_name not in settings.PAGE_CACHE_VIEWS:
+            return None
+
+        authenticated = request.user.is_authenticated
+        if (authenticated
+                and view_name not in settings.PAGE_CACHE_PERSONAL_VIEWS):
+            return None
+
+        key, stale_key = page_keys(request)
+        if authenticated:
+            # Пользователям - только свежие страницы, пересчитывают
+            # их анонимы.
+            cached = stampede.peek(key)
+            if cached is MISSING:
+                return None
+            return self.personal_response(request, cached)
+
+        cached, recompute = stampede.lookup(key, stale_key)
+        if recompute:
+            request._page_cache_keys = (key, stale_key, time.perf_counter())
+        if cached is MISSING:
+            # Без блокировки страницу считаем, но не сохраняем: её
+            # сохранит и снимет блокировку тот, кто её взял.
+            return None
+        return self.anonymous_response(request, cached)
+
+    def storable(self, request, response):
+        # Страницы с CSRF-токеном привязаны к cookie посетителя.
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    def build(self, cached, content=None):
+        status, cached_content, headers = cached
+        response = HttpResponse(content or cached_content, status=status)
+        for name, value in headers:
+            response[name] = value
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+    def anonymous_response(self, request, cached):
+        response = self.build(cached)
+        patch_vary_headers(response, ('Cookie',))
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')
+            ),
+            response=response,
+        )
+
+    def personal_response(self, request, cached):
+        response = self.build(cached, personalize(cached[1], request))
+        for name in ANONYMOUS_HEADERS:
+            if response.has_header(name):
+                del response[name]
+        response['Content-Length'] = len(response.content)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class MetricsMiddleware:
+    """Собирает core.metrics по представлениям при METRICS_ENABLED.
+
+    Стоит первым в MIDDLEWARE, чтобы время ответа включало остальные
+    middleware, в том числе отдачу страниц из кеша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = metrics.RequestStats()
+        metrics.activate(stats)
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate()
+
+        match = request.resolver_match
+        metrics.REGISTRY.record(
+            match.view_name if match else 'unresolved',
+            stats,
+            time.perf_counter() - started,
+        )
+        return response
+
+
+class QueryTraceMiddleware:
+    """Трассирует SQL каждого запроса при QUERY_TRACE_ENABLED
+    (см. core/querytrace.py)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_TRACE_ENABLED:
+            return self.get_response(request)
+
+        with QueryTracer() as request.query_tracer:
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        tracer = getattr(request, 'query_tracer', None)
+        if tracer is not None:
+            tracer.view = request.resolver_match.view_name
+
+
+class ReplicaPinMiddleware:
+    """Сообщает core.routers, когда читать из основной базы.
+
+    Время последней записи посетителя хранится в кеше по ключу сессии,
+    поэтому middleware стоит до SessionMiddleware: запись сессии тоже
+    считается записью.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        routers.begin(
+            primary=request.method not in SAFE_METHODS,
+            written_at=session_key and cache.get(written_key(session_key)),
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end()
+
+        if wrote:
+            # Вход и выход меняют ключ сессии.
+            cookie = response.cookies.get(settings.SESSION_COOKIE_NAME)
+            if cookie is not None:
+                session_key = cookie.value
+            if session_key:
+                cache.set(
+                    written_key(session_key),
+                    time.time(),
+                    settings.REPLICA_PIN_SECONDS,
+                )
+        return response
+
+
+def written_key(session_key):
+    return WRITTEN_KEY.format(hashlib.md5(session_key.encode()).hexdigest())
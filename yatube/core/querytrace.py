@@ -0,0 +1,157 @@
+"""Трассировка SQL-запросов: медленные запросы и N+1.
+
+QueryTracer оборачивает выполнение запросов на всех подключениях
+(connection.execute_wrapper) и запоминает для каждого отпечаток SQL
+(текст без значений) и место вызова: строку кода проекта и строку
+шаблона, если запрос сделан при рендеринге. Запросы дольше
+QUERY_TRACE_SLOW_MS пишутся в лог сразу, отпечатки, повторённые
+больше QUERY_TRACE_MAX_REPEATS раз, - по окончании трассировки.
+В строгом режиме находки вызывают QueryProblems, что роняет тесты.
+"""
+
+import contextlib
+import logging
+import os
+import re
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+from . import backends
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+# Служебные запросы транзакций повторяются законно.
+IGNORED_RE = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO)\b')
+
+RENDER_CODE = Node.render_annotated.__code__
+# Обёртки рендеринга и трассировки не считаются местом вызова.
+SKIPPED_FILES = {os.path.abspath(__file__), os.path.abspath(backends.__file__)}
+
+
+class QueryProblems(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Текст запроса без значений: литералы и параметры заменены на ?,
+    списки IN (?, ?, ...) свёрнуты."""
+
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql.replace('%s', '?'))
+    sql = LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def origin():
+    """Строка кода проекта и строка шаблона, откуда выполнен запрос."""
+
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and not (code and template):
+        if template is None and frame.f_code is RENDER_CODE:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            if token is not None and node.origin is not None:
+                template = f'{node.origin.template_name}:{token.lineno}'
+        elif code is None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if (filename.startswith(settings.BASE_DIR)
+                    and filename not in SKIPPED_FILES
+                    and 'site-packages' not in filename):
+                path = os.path.relpath(filename, settings.BASE_DIR)
+                code = f'{path}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+
+    return ' -> '.join(filter(None, (code, template))) or '?'
+
+
+def places_text(places):
+    return ', '.join(sorted(set(places)))
+
+
+class QueryTracer:
+    def __init__(self, view='', strict=None, slow_ms=None, max_repeats=None):
+        self.view = view
+        self.strict = settings.QUERY_TRACE_STRICT if strict is None else strict
+        self.slow_ms = (
+            settings.QUERY_TRACE_SLOW_MS if slow_ms is None else slow_ms
+        )
+        self.max_repeats = (
+            settings.QUERY_TRACE_MAX_REPEATS if max_repeats is None
+            else max_repeats
+        )
+        self.queries = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, (time.perf_counter() - started) * 1000)
+
+    def record(self, sql, elapsed_ms):
+        key = fingerprint(sql)
+        if IGNORED_RE.match(key):
+            return
+
+        where = origin()
+        self.queries.setdefault(key, []).append(where)
+        if elapsed_ms >= self.slow_ms:
+            self.slow.append((elapsed_ms, sql, where))
+            logger.warning(
+                'Медленный запрос %.1f мс в %s (%s): %s',
+                elapsed_ms, self.view or '?', where, sql,
+            )
+
+    def duplicates(self):
+        """Отпечатки, выполненные больше max_repeats раз, с местами."""
+
+        return {
+            key: places for key, places in self.queries.items()
+            if len(places) > self.max_repeats
+        }
+
+    def problems(self):
+        found = [
+            f'{len(places)} раз: {key}; места: {places_text(places)}'
+            for key, places in self.duplicates().items()
+        ]
+        found.extend(
+            f'{elapsed:.1f} мс: {sql}; место: {where}'
+            for elapsed, sql, where in self.slow
+        )
+        return found
+
+    def finish(self):
+        for key, places in self.duplicates().items():
+            logger.warning(
+                'Повторяющийся запрос (%d раз) в %s: %s; места: %s',
+                len(places), self.view or '?', key, places_text(places),
+            )
+        if self.strict:
+            problems = self.problems()
+            if problems:
+                raise QueryProblems(
+                    f'Проблемы запросов в {self.view or "?"}:\n'
+                    + '\n'.join(problems)
+                )
+
+    def __enter__(self):
+        self.stack = contextlib.ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stack.close()
+        if exc_type is None:
+            self.finish()
@@ -0,0 +1,116 @@
+"""Чтение с реплик, запись в основную базу.
+
+Запросы на чтение уходят на случайную реплику из DATABASE_REPLICAS,
+кроме случаев, когда реплика может не знать о свежей записи:
+
+- запрос изменяет данные (не GET/HEAD/OPTIONS) или уже что-то
+  записал - до конца запроса всё читается из основной базы;
+- посетитель недавно что-то записал - для него годятся только
+  реплики, которые уже применили изменения на момент его записи
+  (read-your-writes). Время последней записи хранится в кеше
+  по сессии (ReplicaPinMiddleware) не дольше REPLICA_PIN_SECONDS.
+
+Реплики, отстающие больше чем на REPLICA_MAX_LAG секунд, не
+используются вовсе. Отставание проверяется не чаще раза в
+REPLICA_LAG_CHECK_INTERVAL секунд.
+"""
+
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+# Момент, до которого реплика применила журнал основной базы.
+POSTGRES_POSITION_SQL = (
+    'SELECT extract(epoch FROM CASE '
+    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN now() '
+    'ELSE pg_last_xact_replay_timestamp() END)'
+)
+
+_state = threading.local()
+_positions = {}
+
+
+def begin(primary=False, written_at=None):
+    """Начало запроса: primary - читать только из основной базы,
+    written_at - время последней записи посетителя."""
+
+    _state.primary = primary
+    _state.written_at = written_at
+    _state.wrote = False
+
+
+def end():
+    """Конец запроса; True, если запрос что-то записал."""
+
+    wrote = getattr(_state, 'wrote', False)
+    begin()
+    return wrote
+
+
+def replica_position(alias):
+    """Время (unix), до которого реплика догнала основную базу."""
+
+    checked_at, position = _positions.get(alias, (0, None))
+    now = time.time()
+    if now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return position
+
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        # Другие базы используются как реплики только в разработке
+        # и тестах (TEST MIRROR) - отставания у них нет.
+        position = now
+    else:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(POSTGRES_POSITION_SQL)
+                value = cursor.fetchone()[0]
+            position = float(value) if value is not None else 0
+        except DatabaseError:
+            logger.exception('Не удалось проверить реплику %s', alias)
+            position = 0
+
+    _positions[alias] = (now, position)
+    return position
+
+
+def usable_replicas(written_at=None):
+    now = time.time()
+    usable = []
+    for alias in settings.DATABASE_REPLICAS:
+        position = replica_position(alias)
+        if now - position > settings.REPLICA_MAX_LAG:
+            continue
+        if written_at is not None and position < written_at:
+            continue
+        usable.append(alias)
+    return usable
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not settings.DATABASE_REPLICAS
+                or getattr(_state, 'primary', False)
+                or getattr(_state, 'wrote', False)):
+            return PRIMARY
+
+        replicas = usable_replicas(getattr(_state, 'written_at', None))
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,31 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.test import override_settings, runner
+
+from yatube.caches import caches
+
+
+@contextmanager
+def isolated_caches():
+    """Кеш тестов во временном файле: общий кеш запущенного сервера
+    не очищается и не получает ключей тестов."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = 'sqlite:///' + os.path.join(directory, 'cache.sqlite3')
+        with override_settings(
+            CACHES=caches({**os.environ, 'CACHE_URL': url}),
+        ):
+            yield
+
+
+class DiscoverRunner(runner.DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = isolated_caches()
+        self._caches.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,47 @@
+"""Хранилища сессий для SESSION_MODE (см. settings.SESSION_ENGINES).
+
+db         таблица django_session: запрос к ней на каждый ответ
+           вошедшему пользователю;
+cached_db  общий кеш перед таблицей: таблица читается только при
+           промахе кеша, пишется - при изменении сессии;
+           несуществующие сессии тоже запоминаются в кеше, поэтому
+           устаревшая cookie не ведёт в базу на каждом запросе;
+signed_cookies  данные в подписанной cookie, без таблицы и кеша;
+           выйти на других устройствах нельзя до истечения cookie.
+
+Сессия загружается лениво - при первом обращении к request.user
+или request.session; без cookie сессии база не трогается вовсе.
+Просроченные сессии manage.py clearsessions удаляет пачками по
+SESSION_CLEANUP_BATCH_SIZE: каждая пачка - свой короткий DELETE,
+и запись постов не ждёт одного большого.
+"""
+
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class BatchedCleanupMixin:
+    @classmethod
+    def clear_expired(cls, batch_size=None, pause=None):
+        """Удаляет просроченные сессии пачками; возвращает их число."""
+
+        batch_size = batch_size or settings.SESSION_CLEANUP_BATCH_SIZE
+        pause = settings.SESSION_CLEANUP_PAUSE if pause is None else pause
+        model = cls.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            keys = list(
+                expired.values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(
+                session_key__in=keys,
+            ).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+            # Даём пройти записям, ждущим блокировку SQLite.
+            time.sleep(pause)
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+from . import BatchedCleanupMixin
+
+MISSING_KEY = 'core.sessions.missing:{}'
+
+
+class SessionStore(BatchedCleanupMixin, cached_db.SessionStore):
+    def load(self):
+        session_key = self.session_key
+        if session_key is None:
+            return {}
+        missing_key = MISSING_KEY.format(session_key)
+        if self._cache.get(missing_key):
+            self._session_key = None
+            return {}
+
+        data = super().load()
+        if self.session_key is None:
+            # Сессии нет в базе: cookie устарела или подделана.
+            self._cache.set(
+                missing_key, True, settings.SESSION_MISSING_TIMEOUT,
+            )
+        return data
@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import db
+
+from . import BatchedCleanupMixin
+
+
+class SessionStore(BatchedCleanupMixin, db.SessionStore):
+    pass
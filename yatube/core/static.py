@@ -0,0 +1,195 @@
+"""Раздача статики без nginx (STATIC_SERVE).
+
+Файлы берутся из STATIC_ROOT (collectstatic), а если их там нет -
+через поисковики staticfiles, как в runserver. Ответ:
+
+- сжатая копия .br или .gz (core/storage.py), если клиент её
+  принимает (Accept-Encoding с учётом q), с Vary: Accept-Encoding;
+- имя с хешем содержимого кешируется навсегда (immutable), прочие
+  файлы - на STATIC_MAX_AGE секунд с проверкой ETag/Last-Modified;
+- один диапазон Range: bytes=... отдаётся ответом 206; несколько
+  диапазонов отдаются целым файлом, как разрешает RFC 7233.
+  If-Range принимает ETag или дату Last-Modified.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Сжатые копии в порядке предпочтения сервера.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# ManifestStaticFilesStorage вставляет 12 знаков md5 перед расширением.
+HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+def find(path):
+    if settings.STATIC_ROOT:
+        try:
+            full_path = safe_join(settings.STATIC_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404
+        if os.path.isfile(full_path):
+            return full_path
+    try:
+        full_path = finders.find(path)
+    except SuspiciousFileOperation:
+        raise Http404
+    # FileSystemFinder находит и каталоги.
+    if not full_path or not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+def accepted(header):
+    """Веса кодировок из Accept-Encoding; 0 - кодировка запрещена."""
+
+    weights = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        weight = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                weight = float(match.group(1))
+            except ValueError:
+                weight = 0
+        if name:
+            weights[name.strip().lower()] = weight
+    return weights
+
+
+def choose_variant(full_path, header):
+    """Путь к файлу для отдачи и его Content-Encoding (или None)."""
+
+    weights = accepted(header)
+    default = weights.get('*', 0)
+    options = [
+        (weights.get(encoding, default), -number, encoding, suffix)
+        for number, (encoding, suffix) in enumerate(ENCODINGS)
+    ]
+    # При равных весах - порядок ENCODINGS.
+    for weight, _, encoding, suffix in sorted(options, reverse=True):
+        if weight > 0 and os.path.isfile(full_path + suffix):
+            return full_path + suffix, encoding
+    return full_path, None
+
+
+def parse_range(header, size):
+    """(начало, конец включительно) одного диапазона, None - отдать
+    файл целиком, ValueError - диапазон вне файла."""
+
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # bytes=-500 - последние 500 байт.
+        length = int(end)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def if_range_matches(value, etag, last_modified):
+    """Совпадает ли If-Range с файлом (RFC 7233, 3.2): ETag сравнивается
+    строго, дата - точно с Last-Modified."""
+
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def ranged_response(request, path, size, etag, last_modified):
+    """Ответ 206 или None, если нужен весь файл; ValueError -
+    диапазон вне файла."""
+
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and not if_range_matches(if_range, etag, last_modified):
+        return None
+    bounds = parse_range(header, size)
+    if bounds is None:
+        return None
+
+    start, end = bounds
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        read_range(path, start, length), status=206,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = length
+    return response
+
+
+@require_safe
+def serve(request, path):
+    full_path = find(path)
+
+    variant, encoding = choose_variant(
+        full_path, request.META.get('HTTP_ACCEPT_ENCODING', ''),
+    )
+    stat = os.stat(variant)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}'
+    etag += f'-{encoding}"' if encoding else '"'
+
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified,
+    )
+    if response is None:
+        try:
+            response = ranged_response(
+                request, variant, stat.st_size, etag, last_modified,
+            )
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+    if response is None:
+        response = FileResponse(open(variant, 'rb'))
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        IMMUTABLE if HASHED_RE.search(path)
+        else f'public, max-age={settings.STATIC_MAX_AGE}'
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,86 @@
+"""Хранилище статики: имена с хешем содержимого и сжатые копии.
+
+collectstatic записывает файлы под именами с хешем (manifest
+staticfiles.json) и рядом со сжимаемыми файлами - копии .gz и .br.
+Их отдаёт core/static.py или nginx (gzip_static, brotli_static).
+Пакет brotli есть в requirements.txt; без него (например, на сборке
+без компилятора) collectstatic пишет только .gz.
+
+Ссылка на файл, которого нет (в шаблоне или url() в CSS), остаётся
+без хеша вместо ошибки: сборка и страницы не падают из-за
+отсутствующей картинки.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml',
+    '.html', '.ico', '.ttf', '.otf', '.eot',
+}
+# Сжатая копия, выигрывающая меньше 5%, не нужна.
+MIN_RATIO = 0.95
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stored = {}
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # Файла нет.
+            return name
+
+    def stored_name(self, name):
+        # Без manifest (статика не собрана) имя вычисляется по файлу -
+        # запоминаем, чтобы не проверять файл на каждой странице.
+        stored = self._stored.get(name)
+        if stored is None:
+            stored = self._stored[name] = super().stored_name(name)
+        return stored
+
+    def post_process(self, paths, dry_run=False, **options):
+        self._stored.clear()
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                processed_names.update((name, hashed_name))
+            yield name, hashed_name, processed
+
+        if not dry_run:
+            for name in sorted(processed_names):
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, compress in compressors():
+            path = self.path(name + suffix)
+            compressed = compress(data)
+            if len(compressed) < len(data) * MIN_RATIO:
+                with open(path, 'wb') as file:
+                    file.write(compressed)
+            elif os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,32 @@
+import json
+
+from django import template
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+MARKER = '<!--personal {}-->{}<!--/personal-->'
+
+
+def render_fragment(template_name, extra, request):
+    return render_to_string(template_name, extra, request=request)
+
+
+@register.simple_tag(takes_context=True)
+def personal(context, template_name, **extra):
+    """Фрагмент страницы, зависящий от пользователя.
+
+    {% personal 'includes/header.html' %}
+
+    Фрагмент рендерится только из запроса и extra, без контекста
+    страницы, и размечается комментариями: кеш страниц
+    (core.middleware.AnonymousPageCacheMiddleware) отдаёт закешированную
+    страницу вошедшему пользователю, перерендерив только такие
+    фрагменты.
+    """
+
+    fragment = render_fragment(template_name, extra, context.get('request'))
+    spec = json.dumps({'template': template_name, 'extra': extra})
+    return format_html(MARKER, mark_safe(spec), mark_safe(fragment))
@@ -1,5 +1,15 @@
 from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from .metrics import REGISTRY
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 
 def page_not_found(request, exception):
@@ -29,3 +39,33 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def can_read_metrics(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''),
+        f'Bearer {token}',
+    )
+
+
+@never_cache
+def metrics(request):
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return JsonResponse(
+        REGISTRY.snapshot(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
+
+
+@never_cache
+def metrics_prometheus(request):
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(
+        REGISTRY.prometheus(),
+        content_type=PROMETHEUS_CONTENT_TYPE,
+    )
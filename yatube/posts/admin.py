@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import get_backend
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -17,6 +18,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('created',)
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по индексу (posts/search.py), а не LIKE по всей таблице.
+        if not search_term.strip():
+            return queryset, False
+        return get_backend().filter(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
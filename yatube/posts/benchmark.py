@@ -0,0 +1,287 @@
+"""Замеры задержки и числа запросов для всех адресов posts и users.
+
+Каждый адрес из URLCONFS запрашивается тестовым клиентом Django
+анонимно и от имени пользователя: сначала warmup запросов для
+прогрева кешей, затем requests замеренных. Число SQL-запросов
+снимается отдельным запросом после замеров. Отчёт - JSON с коммитом,
+по которому его можно сравнить с отчётом другой версии.
+
+run_sessions() сравнивает хранилища сессий (settings.SESSION_ENGINES)
+на лентах SESSION_URLS от имени вошедшего пользователя.
+
+Замеры идут в транзакции, которая в конце откатывается: комментарии,
+подписки и сессии не остаются в базе, и следующий запуск мерит те же
+данные.
+"""
+
+import math
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import feed_cache, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+URLCONFS = ('posts.urls', 'users.urls')
+CLIENTS = ('anon', 'user')
+# Адреса, которые замеряются POST-запросом с этими данными.
+POST_DATA = {
+    'posts:add_comment': {'text': 'Комментарий для замера'},
+}
+# После этих адресов сессия завершена, перед каждым запросом
+# пользователь входит заново.
+RELOGIN = {'users:logout'}
+SESSION_URLS = ('posts:index', 'posts:follow_index')
+SESSION_TABLE = 'django_session'
+
+
+def url_names():
+    """Имена адресов с пространством имён и параметры их шаблонов."""
+
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        for pattern in module.urlpatterns:
+            yield (
+                f'{module.app_name}:{pattern.name}',
+                list(pattern.pattern.converters),
+            )
+
+
+def targets():
+    """Пользователь для входа и значения параметров адресов.
+
+    Берутся самые нагруженные объекты: свежий пост с группой (его
+    автор входит на сайт) и автор с наибольшим числом подписчиков.
+    """
+
+    post = Post.objects.select_related('author', 'group').filter(
+        group__isnull=False,
+    ).order_by('-created').first()
+    if post is None:
+        post = Post.objects.select_related('author').order_by(
+            '-created'
+        ).first()
+    if post is None:
+        raise ValueError('Нет постов: сначала выполните seed_benchmark')
+
+    popular = UserStats.objects.select_related('user').order_by(
+        '-followers_count'
+    ).first()
+    group = post.group or Group.objects.order_by('pk').first()
+
+    params = {
+        'post_id': post.pk,
+        'username': (popular.user if popular else post.author).username,
+        'slug': group.slug if group else '',
+    }
+    return post.author, params
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга."""
+
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+@contextmanager
+def rolled_back(params):
+    """Откатывает всё, что записали замеры.
+
+    Кеш транзакцией не откатывается, поэтому ленты, которые могли
+    закешироваться с откаченными строками, получают новое поколение.
+    """
+
+    try:
+        with transaction.atomic():
+            yield
+            transaction.set_rollback(True)
+    finally:
+        post = Post.objects.only('author_id', 'group_id').get(
+            pk=params['post_id'],
+        )
+        author = User.objects.get(username=params['username'])
+        timeline.reset_pull_authors()
+        feed_cache.bump(
+            *feed_cache.post_scopes(post),
+            feed_cache.scope('author', author.pk),
+        )
+
+
+class Case:
+    """Один адрес для одного вида клиента."""
+
+    def __init__(self, name, path, kind, user):
+        self.name = name
+        self.path = path
+        self.kind = kind
+        self.user = user
+        self.data = POST_DATA.get(name)
+        self.client = Client()
+
+    def prepare(self):
+        if self.kind == 'user' and (
+            self.name in RELOGIN or '_auth_user_id' not in self.client.session
+        ):
+            self.client.force_login(self.user)
+
+    def request(self):
+        if self.data is not None:
+            return self.client.post(self.path, self.data)
+        return self.client.get(self.path)
+
+    def run(self, requests, warmup):
+        for _ in range(warmup):
+            self.prepare()
+            self.request()
+
+        timings = []
+        for _ in range(requests):
+            self.prepare()
+            started = time.perf_counter()
+            response = self.request()
+            timings.append(time.perf_counter() - started)
+
+        self.prepare()
+        with CaptureQueriesContext(connection) as queries:
+            self.request()
+
+        return {
+            'url': self.name,
+            'client': self.kind,
+            'path': self.path,
+            'status': response.status_code,
+            'requests': requests,
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'queries': len(queries),
+            'session_queries': sum(
+                SESSION_TABLE in query['sql']
+                for query in queries.captured_queries
+            ),
+        }
+
+
+def report(results):
+    return {
+        'commit': git_commit(),
+        'created': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'rows': {
+            model._meta.model_name: model.objects.count()
+            for model in (User, Group, Post, Comment, Follow)
+        },
+        'results': results,
+    }
+
+
+def run(requests=50, warmup=3, only=None, write=lambda line: None):
+    user, params = targets()
+    results = []
+
+    with rolled_back(params):
+        for name, arguments in url_names():
+            if only and name not in only:
+                continue
+            path = reverse(
+                name, kwargs={key: params[key] for key in arguments},
+            )
+            for kind in CLIENTS:
+                result = Case(name, path, kind, user).run(requests, warmup)
+                results.append(result)
+                write(format_result(result))
+
+    return report(results)
+
+
+def run_sessions(modes=None, requests=50, warmup=3, write=lambda line: None):
+    """Замеры SESSION_URLS в каждом режиме сессий."""
+
+    user, params = targets()
+    results = []
+
+    with rolled_back(params):
+        for mode in modes or settings.SESSION_ENGINES:
+            engine = settings.SESSION_ENGINES[mode]
+            # Клиент и его middleware создаются уже с этим хранилищем.
+            with override_settings(SESSION_ENGINE=engine):
+                for name in SESSION_URLS:
+                    result = Case(name, reverse(name), 'user', user).run(
+                        requests, warmup,
+                    )
+                    result['session'] = mode
+                    results.append(result)
+                    write(format_result(result))
+
+    return report(results)
+
+
+def label(row):
+    client = row['client']
+    if row.get('session'):
+        client = f'{client} {row["session"]}'
+    return f'{row["url"]:<28} {client:<5}'
+
+
+def format_result(result):
+    return (
+        f'{label(result)} {result["status"]} '
+        f'p50 {result["p50_ms"]:8.2f} мс  p99 {result["p99_ms"]:8.2f} мс  '
+        f'запросов {result["queries"]} '
+        f'(сессия {result.get("session_queries", 0)})'
+    )
+
+
+def row_key(row):
+    return row['url'], row['client'], row.get('session')
+
+
+def _change(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old:+.0%}'
+
+
+def compare(old, new):
+    """Строки сравнения двух отчётов по совпадающим адресам."""
+
+    before = {row_key(row): row for row in old['results']}
+    lines = [f'{old["commit"] or "?"} -> {new["commit"] or "?"}']
+    for row in new['results']:
+        previous = before.get(row_key(row))
+        if previous is None:
+            lines.append(f'{label(row)} новый адрес')
+            continue
+        lines.append(
+            f'{label(row)} '
+            f'p50 {previous["p50_ms"]:.2f} -> {row["p50_ms"]:.2f} мс '
+            f'{_change(previous["p50_ms"], row["p50_ms"]):>6}  '
+            f'p99 {previous["p99_ms"]:.2f} -> {row["p99_ms"]:.2f} мс '
+            f'{_change(previous["p99_ms"], row["p99_ms"]):>6}  '
+            f'запросов {previous["queries"]} -> {row["queries"]}'
+        )
+    return lines
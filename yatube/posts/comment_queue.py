@@ -0,0 +1,237 @@
+"""Очередь записи комментариев.
+
+add_comment не вставляет комментарий сам, а отдаёт его в submit().
+Без COMMENT_QUEUE_ASYNC комментарий пишется сразу.
+
+При COMMENT_QUEUE_ASYNC submit() сохраняет комментарий в таблицу
+PendingComment в транзакции запроса: принятый комментарий переживает
+перезапуск процесса. Фоновый поток раз в COMMENT_FLUSH_INTERVAL
+секунд переносит ожидающие комментарии в Comment пачками до
+COMMENT_BATCH_SIZE штук - одним INSERT ... SELECT, с обновлением
+счётчиков и поколений лент один раз на пачку. Поток переносит и
+комментарии, оставшиеся от остановленного процесса; после
+перезапуска их можно перенести и командой flush_comments.
+
+Пока комментарий ждёт, автор видит его на странице поста: в кеше
+лежит признак "есть ожидающие" (ключ на пользователя, без
+чтения-изменения-записи), и только тогда страница читает их
+из PendingComment. bulk_create и INSERT ... SELECT не вызывают
+сигналы, поэтому запись сама обновляет счётчики и поколения лент.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+from . import counters, feed_cache
+from .models import Comment, PendingComment, Post
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'comments:pending:{}'
+# Как часто join() проверяет, всё ли записано, секунды.
+JOIN_POLL_INTERVAL = 0.02
+
+_wake = None
+_start_lock = threading.Lock()
+
+
+class Conflict(Exception):
+    """Пачку одновременно забрал другой процесс."""
+
+
+def pending_key(user_id):
+    return PENDING_KEY.format(user_id)
+
+
+def pending_comments(user, post_id):
+    """Ещё не записанные комментарии пользователя к посту."""
+
+    if not user.is_authenticated or not cache.get(pending_key(user.pk)):
+        return []
+    pending = PendingComment.objects.filter(
+        author_id=user.pk, post_id=post_id,
+    ).values_list('text', 'created')
+    return [
+        Comment(post_id=post_id, author=user, text=text, created=created)
+        for text, created in pending
+    ]
+
+
+def count_comments(added):
+    """Счётчики постов; added - число новых комментариев по pk поста."""
+
+    for post_id, count in added.items():
+        counters.bump(
+            Post.objects.filter(pk=post_id),
+            'comments_count',
+            count,
+        )
+
+
+def bump_feeds(added, posts):
+    """Сдвигает поколения лент; после коммита, чтобы лента
+    не закешировалась по старым данным с новым поколением."""
+
+    scopes = set()
+    for post_id in added:
+        scopes |= feed_cache.post_scopes(posts[post_id])
+    feed_cache.bump(*scopes)
+
+
+def flush(items, posts=None):
+    """Записывает пачку комментариев одной транзакцией.
+
+    posts - уже загруженные посты пачки по pk (нужны author_id
+    и group_id для поколений лент).
+    """
+
+    if posts is None:
+        posts = {
+            post.pk: post
+            for post in Post.objects.filter(
+                pk__in={item['post_id'] for item in items}
+            ).only('pk', 'author_id', 'group_id')
+        }
+    # Пост могли удалить, пока комментарий ждал в очереди.
+    comments = [
+        Comment(
+            post_id=item['post_id'],
+            author_id=item['author_id'],
+            text=item['text'],
+        )
+        for item in items
+        if item['post_id'] in posts
+    ]
+
+    added = Counter(comment.post_id for comment in comments)
+    with transaction.atomic(savepoint=False):
+        Comment.objects.bulk_create(comments)
+        count_comments(added)
+    bump_feeds(added, posts)
+    return len(comments)
+
+
+def move_pending(pks):
+    """INSERT ... SELECT из PendingComment в Comment с временем приёма."""
+
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(Comment._meta.get_field(name).column)
+        for name in ('post', 'author', 'text', 'created')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(Comment._meta.db_table)} ({columns}) '
+            f'SELECT {columns} '
+            f'FROM {quote(PendingComment._meta.db_table)} '
+            f'WHERE {quote(PendingComment._meta.pk.column)} '
+            f'IN ({", ".join(["%s"] * len(pks))}) '
+            f'ORDER BY {quote(PendingComment._meta.pk.column)}',
+            pks,
+        )
+
+
+def flush_pending(limit):
+    """Переносит до limit ожидающих комментариев одной транзакцией,
+    возвращает их число."""
+
+    with transaction.atomic():
+        # На PostgreSQL процессы берут разные пачки; на SQLite
+        # запись второго процесса упадёт, и Conflict откатит её.
+        rows = list(
+            PendingComment.objects.select_for_update(skip_locked=True)
+            .order_by('pk').values_list('pk', 'post_id')[:limit]
+        )
+        if not rows:
+            return 0
+        pks = [pk for pk, _ in rows]
+        move_pending(pks)
+        deleted, _ = PendingComment.objects.filter(pk__in=pks).delete()
+        if deleted != len(pks):
+            raise Conflict
+        added = Counter(post_id for _, post_id in rows)
+        count_comments(added)
+        posts = Post.objects.filter(pk__in=added).only(
+            'pk', 'author_id', 'group_id',
+        ).in_bulk()
+    bump_feeds(added, posts)
+    return len(rows)
+
+
+def drain():
+    """Переносит все ожидающие комментарии в текущем потоке."""
+
+    total = 0
+    while True:
+        written = flush_pending(settings.COMMENT_BATCH_SIZE)
+        total += written
+        if written < settings.COMMENT_BATCH_SIZE:
+            return total
+
+
+def _worker(wake):
+    while True:
+        wake.wait()
+        # Пауза набирает пачку из комментариев соседних запросов.
+        time.sleep(settings.COMMENT_FLUSH_INTERVAL)
+        wake.clear()
+        try:
+            drain()
+        except Conflict:
+            # Пачку записал другой процесс; остальное - в следующий раз.
+            wake.set()
+        except Exception:
+            logger.exception('Не удалось записать комментарии')
+        finally:
+            close_old_connections()
+
+
+def _get_wake():
+    global _wake
+    with _start_lock:
+        if _wake is None:
+            _wake = threading.Event()
+            threading.Thread(
+                target=_worker,
+                args=(_wake,),
+                name='comments',
+                daemon=True,
+            ).start()
+    return _wake
+
+
+def submit(post, author_id, text):
+    """Принимает комментарий; post загружен хотя бы с author_id
+    и group_id."""
+
+    if not settings.COMMENT_QUEUE_ASYNC:
+        flush(
+            [{'post_id': post.pk, 'author_id': author_id, 'text': text}],
+            {post.pk: post},
+        )
+        return
+
+    PendingComment.objects.create(
+        post_id=post.pk, author_id=author_id, text=text,
+    )
+    cache.set(
+        pending_key(author_id), True, settings.COMMENT_PENDING_TIMEOUT,
+    )
+    # Поток будим после коммита запроса, когда строка уже видна.
+    transaction.on_commit(lambda: _get_wake().set())
+
+
+def join(timeout=10):
+    """Ждёт, пока фоновый поток перенесёт все ожидающие комментарии."""
+
+    deadline = time.monotonic() + timeout
+    while PendingComment.objects.exists():
+        if time.monotonic() > deadline:
+            raise TimeoutError('Комментарии не записаны')
+        time.sleep(JOIN_POLL_INTERVAL)
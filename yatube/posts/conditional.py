@@ -0,0 +1,88 @@
+"""Условные GET-запросы: ETag и Last-Modified для лент и постов.
+
+Валидаторы считаются до выборки и рендера, поэтому запрос
+с актуальным If-None-Match/If-Modified-Since обходится одним-двумя
+обращениями к кешу и получает 304 без тела.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date
+
+from . import feed_cache
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def feed_validators(name, posts, *extra):
+    """ETag и Last-Modified ленты по её поколению в feed_cache."""
+
+    return (
+        make_etag(name, feed_cache.generation(name), *extra),
+        feed_cache.last_modified(name, posts),
+    )
+
+
+def page_validators(request, name, posts, *extra):
+    """Валидаторы HTML-страницы ленты.
+
+    Страница зависит ещё и от пользователя (шапка, кнопки подписки
+    и правки), а числа подписчиков в карточках чужих лент обновляются
+    только по FEED_CACHE_TIMEOUT - поэтому ETag включает пользователя
+    и номер интервала таймаута.
+    """
+
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    interval = int(time.time() // settings.FEED_CACHE_TIMEOUT)
+    return feed_validators(name, posts, user, interval, *extra)
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Ответ 304 с валидаторами, если у клиента актуальная версия."""
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp()),
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def patch_page_cache(request, response):
+    """Cache-Control для HTML-страниц.
+
+    Анонимные страницы без CSRF-токена может хранить прокси
+    (s-maxage), браузер перепроверяет их каждый раз. Всё остальное
+    кешируется только в браузере и тоже с перепроверкой.
+    """
+
+    if request.user.is_authenticated or request.META.get('CSRF_COOKIE_USED'):
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=settings.PAGE_PROXY_MAX_AGE,
+        )
+    patch_vary_headers(response, ('Cookie',))
+    return response
@@ -0,0 +1,98 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарно через F(), без чтения строки.
+Расхождения чинит manage.py recount.
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _delta(field, delta):
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def bump(queryset, field, delta):
+    queryset.update(**{field: _delta(field, delta)})
+
+
+def bump_user(user_id, field, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: _delta(field, delta)}
+    )
+    if not updated and delta > 0:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id)],
+            ignore_conflicts=True,
+        )
+        bump(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def _count(model, field, **extra):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю строку."""
+
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **extra).order_by()
+    return Coalesce(
+        Subquery(
+            rows.values(field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _repair(queryset, counters, dry_run):
+    """Чинит строки, где счётчик разошёлся с фактом; возвращает их число."""
+
+    annotations = {f'actual_{field}': expr for field, expr in counters.items()}
+    drift = Q()
+    for field in counters:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+
+    broken = queryset.annotate(**annotations).filter(drift)
+    pks = list(broken.values_list('pk', flat=True))
+
+    if pks and not dry_run:
+        queryset.filter(pk__in=pks).update(**counters)
+
+    return len(pks)
+
+
+def recount(dry_run=False):
+    """Пересчитывает все счётчики, возвращает число исправленных строк."""
+
+    if not dry_run:
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=pk)
+                for pk in User.objects.filter(stats__isnull=True)
+                .values_list('pk', flat=True)
+            ),
+            ignore_conflicts=True,
+        )
+
+    return {
+        'posts': _repair(
+            Post.objects.all(),
+            {'comments_count': _count(Comment, 'post')},
+            dry_run,
+        ),
+        'groups': _repair(
+            Group.objects.all(),
+            {'posts_count': _count(Post, 'group')},
+            dry_run,
+        ),
+        'users': _repair(
+            UserStats.objects.all(),
+            {
+                'posts_count': _count(Post, 'author'),
+                'followers_count': _count(Follow, 'author'),
+                'following_count': _count(Follow, 'user'),
+            },
+            dry_run,
+        ),
+    }
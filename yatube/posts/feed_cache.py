@@ -0,0 +1,77 @@
+"""Поколения лент для кеша фрагментов.
+
+Каждая лента (вся лента, группа, автор) имеет номер поколения.
+Ключ закешированного фрагмента включает номер, поэтому изменение
+поста просто увеличивает номер, и старые фрагменты больше
+не читаются - без ожидания TTL и без перебора ключей.
+Вместе с номером запоминается время изменения ленты для заголовка
+Last-Modified.
+"""
+
+import time
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+INDEX = 'index'
+GENERATION_KEY = 'feed:generation:{}'
+MODIFIED_KEY = 'feed:modified:{}'
+
+
+def scope(name, pk=None):
+    return name if pk is None else f'{name}:{pk}'
+
+
+def post_scopes(post, group_id=None):
+    """Ленты, в которых показывается пост."""
+
+    scopes = {INDEX, scope('author', post.author_id)}
+    for pk in (post.group_id, group_id):
+        if pk is not None:
+            scopes.add(scope('group', pk))
+    return scopes
+
+
+def generation(name):
+    key = GENERATION_KEY.format(name)
+    value = cache.get(key)
+    if value is None:
+        # Стартуем с текущего времени: после вытеснения ключа номер
+        # не откатится к уже использованному.
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def last_modified(name, posts):
+    """Время последнего изменения ленты.
+
+    Если время ещё не запомнено, берём самый свежий updated постов
+    ленты (posts) - как правило, это один запрос за всё время жизни
+    ключа.
+    """
+
+    key = MODIFIED_KEY.format(name)
+    value = cache.get(key)
+    if value is None:
+        newest = posts.order_by().aggregate(newest=Max('updated'))['newest']
+        value = newest.timestamp() if newest else 0
+        cache.add(key, value, None)
+        value = cache.get(key, value)
+    return datetime.fromtimestamp(int(value), timezone.utc)
+
+
+def bump(*names):
+    now = time.time()
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+    cache.set_many(
+        {MODIFIED_KEY.format(name): now for name in names},
+        None,
+    )
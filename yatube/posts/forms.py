@@ -1,6 +1,9 @@
 from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 
 from .models import Comment, Post
+from .uploads import validate_image, validate_upload
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +15,23 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            # ImageField уже открыл картинку, но прочёл только заголовок.
+            validate_image(image.image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        try:
+            validate_upload(self.files.get(self.add_prefix('image')))
+        except ValidationError as error:
+            # Заменяем общую ошибку ImageField на настоящую причину.
+            self.errors.pop('image', None)
+            self.add_error('image', error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
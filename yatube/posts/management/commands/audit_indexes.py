@@ -0,0 +1,108 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.paginator_custom import NEXT, feed_paginator
+from posts.timeline import followers, timeline_posts
+from posts.views import (comments_paginator, feed_posts, following_query,
+                         group_feed, profile_feed)
+
+# Признаки плана без индекса для SQLite и PostgreSQL.
+FULL_SCAN_PATTERNS = (
+    re.compile(r'\bSCAN (TABLE )?\w+$'),
+    re.compile(r'\bSeq Scan\b'),
+)
+# Сортировка только "правой части" ORDER BY - досортировка
+# строк с равной датой, её считаем допустимой.
+TEMP_SORT_PATTERNS = (
+    re.compile(r'USE TEMP B-TREE FOR (?!RIGHT PART)'),
+    re.compile(r'^\s*(->\s*)?Sort\b'),
+)
+
+
+def page_queries(name, paginator):
+    """Запросы первой и следующей страницы ленты."""
+
+    cursor = (timezone.now(), 1, NEXT)
+    return {
+        name: paginator.rows_query(),
+        f'{name} (next page)': paginator.rows_query(cursor),
+    }
+
+
+def view_querysets():
+    """Запросы, которые выполняют представления posts/views.py.
+
+    Строятся теми же функциями, что и в представлениях; объекты -
+    несохранённые заглушки, нужны только их pk.
+    """
+
+    user, author = User(pk=1), User(pk=2)
+    post = Post(pk=1, author=author)
+
+    return {
+        **page_queries('posts:index', feed_paginator(feed_posts())),
+        **page_queries(
+            'posts:group_list', feed_paginator(group_feed(Group(pk=1))),
+        ),
+        **page_queries('posts:profile', feed_paginator(profile_feed(author))),
+        'posts:profile (following)': following_query(author, user),
+        'posts:post_detail': feed_posts().filter(pk=post.pk),
+        **page_queries(
+            'posts:post_detail (comments)', comments_paginator(post),
+        ),
+        **page_queries(
+            'posts:follow_index',
+            feed_paginator(timeline_posts(user), key='feed_created'),
+        ),
+        'posts:post_create (followers)': followers(author.pk),
+    }
+
+
+def find_problems(plan):
+    problems = []
+    for line in plan.splitlines():
+        line = line.strip()
+        if any(p.search(line) for p in FULL_SCAN_PATTERNS):
+            problems.append(f'полный просмотр: {line}')
+        if any(p.search(line) for p in TEMP_SORT_PATTERNS):
+            problems.append(f'сортировка без индекса: {line}')
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов представлений posts '
+        'и сообщает о полных просмотрах таблиц и временных сортировках.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать план каждого запроса.',
+        )
+
+    def handle(self, *args, **options):
+        failed = []
+
+        for name, queryset in view_querysets().items():
+            plan = queryset.explain()
+            problems = find_problems(plan)
+            if problems:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(name))
+                for problem in problems:
+                    self.stdout.write(f'  {problem}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(
+                f'Запросы без подходящих индексов: {", ".join(failed)}'
+            )
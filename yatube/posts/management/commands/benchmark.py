@@ -0,0 +1,89 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p99 задержки и число SQL-запросов для всех адресов '
+        'posts и users, пишет отчёт JSON и сравнивает его с прошлым.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько замеренных запросов на адрес.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Сколько запросов сделать перед замерами.',
+        )
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='Замерять только этот адрес (posts:index), можно повторять.',
+        )
+        parser.add_argument('--output', help='Куда записать отчёт JSON.')
+        parser.add_argument(
+            '--compare',
+            help='Отчёт прошлого запуска для сравнения.',
+        )
+        parser.add_argument(
+            '--sessions',
+            nargs='*',
+            metavar='MODE',
+            help=(
+                'Сравнить режимы сессий (по умолчанию все из '
+                'SESSION_ENGINES) на ленте и ленте подписок.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+
+        modes = options['sessions']
+        unknown = set(modes or ()) - set(settings.SESSION_ENGINES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные режимы сессий: {", ".join(sorted(unknown))}'
+            )
+
+        try:
+            if modes is not None:
+                report = benchmark.run_sessions(
+                    modes=modes,
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    write=self.stdout.write,
+                )
+            else:
+                report = benchmark.run(
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    only=options['urls'],
+                    write=self.stdout.write,
+                )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Отчёт записан в {options["output"]}'
+            ))
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                previous = json.load(file)
+            for line in benchmark.compare(previous, report):
+                self.stdout.write(line)
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import Progress, export_records, open_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, пользователей, посты, комментарии, подписки '
+        'и картинки в NDJSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа.')
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать дамп (включается само для файлов .gz).',
+        )
+        parser.add_argument(
+            '--no-files',
+            action='store_true',
+            help='Не выгружать картинки постов.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        progress = Progress(self.stdout.write)
+        records = export_records(
+            options['batch_size'],
+            files=not options['no_files'],
+        )
+
+        with open_stream(
+            path,
+            'w',
+            compress=options['gzip'] or path.endswith('.gz'),
+        ) as stream:
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False))
+                stream.write('\n')
+                progress.add()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено в {path}: {progress.line()}'
+        ))
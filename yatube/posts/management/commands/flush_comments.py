@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.comment_queue import drain
+
+
+class Command(BaseCommand):
+    help = 'Записывает комментарии, оставшиеся в очереди (PendingComment).'
+
+    def handle(self, *args, **options):
+        total = drain()
+        self.stdout.write(
+            self.style.SUCCESS(f'Записано комментариев: {total}')
+        )
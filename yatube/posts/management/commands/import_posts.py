@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import Importer, Progress, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Загружает дамп export_posts пачками, с контрольной точкой.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа, можно сжатый gzip.')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: повторный запуск продолжит '
+                 'с места остановки.',
+        )
+        parser.add_argument(
+            '--no-files',
+            action='store_true',
+            help='Не загружать картинки постов.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько записей вставлять одним bulk_create.',
+        )
+
+    def handle(self, *args, **options):
+        progress = Progress(self.stdout.write)
+        importer = Importer(
+            options['batch_size'],
+            progress,
+            checkpoint=options['checkpoint'],
+            files=not options['no_files'],
+        )
+
+        with open_stream(options['path'], 'r') as stream:
+            importer.run(stream)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {progress.line()}'
+        ))
+        self.stdout.write(
+            'Миниатюры новых картинок создаст manage.py warm_thumbnails'
+        )
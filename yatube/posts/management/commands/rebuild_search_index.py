@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов.'
+
+    def handle(self, *args, **options):
+        total = get_backend().rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {total}')
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько строк разошлось.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount(dry_run=options['dry_run'])
+
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: {count}')
+
+        if options['dry_run']:
+            self.stdout.write('Изменения не записаны (--dry-run)')
+        else:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками с неравномерным распределением.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ('users', 10_000),
+            ('groups', 200),
+            ('posts', 1_000_000),
+            ('comments', 2_000_000),
+            ('follows', 500_000),
+        ):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Сколько создать, по умолчанию {default}.',
+            )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=3,
+            help='Перекос популярности: 1 - равномерно, больше - сильнее.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределить посты.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Зерно генератора для воспроизводимых данных.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк вставлять одним bulk_create.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Сначала удалить данные прошлых запусков.',
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] and options['users'] < 1:
+            raise CommandError('Для постов нужен хотя бы один пользователь')
+
+        if options['clear']:
+            seeding.clear()
+
+        seeding.seed(
+            options['users'],
+            options['groups'],
+            options['posts'],
+            options['comments'],
+            options['follows'],
+            skew=options['skew'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            days=options['days'],
+            write=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
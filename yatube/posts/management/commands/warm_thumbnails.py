@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для картинок существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число параллельных потоков, 1 - без пула.',
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        )
+
+        started = time.monotonic()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(self.generate, names))
+        else:
+            results = [thumbnails.generate(name) for name in names]
+
+        done = results.count(True)
+        failed = len(results) - done
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюр готово: {done}, ошибок: {failed}, '
+            f'время: {elapsed:.1f} с'
+        ))
+
+    def generate(self, name):
+        try:
+            return thumbnails.generate(name)
+        finally:
+            close_old_connections()
@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    for post in Post.objects.order_by().annotate(
+        total=models.Count('comments')
+    ):
+        Post.objects.filter(pk=post.pk).update(comments_count=post.total)
+
+    for group in Group.objects.annotate(total=models.Count('posts')):
+        Group.objects.filter(pk=group.pk).update(posts_count=group.total)
+
+    users = User.objects.annotate(
+        total_posts=models.Count('posts', distinct=True),
+        total_followers=models.Count('following', distinct=True),
+        total_following=models.Count('follower', distinct=True),
+    )
+    UserStats.objects.bulk_create(
+        UserStats(
+            user_id=user.pk,
+            posts_count=user.total_posts,
+            followers_count=user.total_followers,
+            following_count=user.total_following,
+        )
+        for user in users
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_post_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
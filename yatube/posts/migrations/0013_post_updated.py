@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+def copy_created(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=models.F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, help_text='JSON: ширина, высота, формат и файл каждого варианта', verbose_name='Варианты картинки'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# Копия posts.stemming на момент миграции: изменения стеммера
+# не должны менять то, что делает уже применённая миграция.
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+
+def normalize(text, russian, english):
+    words = []
+    for word in WORD_RE.findall(text or ''):
+        word = word.lower().replace('ё', 'е')
+        if CYRILLIC_RE.search(word):
+            word = russian.stemWord(word)
+        elif word.isascii() and word.isalpha():
+            word = english.stemWord(word)
+        words.append(word)
+    return ' '.join(words)
+
+
+def create_index(apps, schema_editor):
+    # FTS5 есть только в SQLite, на других базах работает LikeBackend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_search '
+        'USING fts5(text, group_title, author_name)'
+    )
+
+    russian = snowballstemmer.stemmer('russian')
+    english = snowballstemmer.stemmer('english')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.select_related('author', 'group').order_by()
+    rows = []
+    for post in posts.iterator():
+        author = post.author
+        rows.append((
+            post.pk,
+            normalize(post.text, russian, english),
+            normalize(
+                post.group.title if post.group_id else '', russian, english,
+            ),
+            normalize(
+                ' '.join(filter(None, (
+                    author.username,
+                    author.first_name,
+                    author.last_name,
+                ))),
+                russian,
+                english,
+            ),
+        ))
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO posts_search(rowid, text, group_title, author_name) '
+            'VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
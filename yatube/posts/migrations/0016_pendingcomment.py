@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingComment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации')),
+                ('text', models.TextField(verbose_name='Текст комментария')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_comments', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_comments', to='posts.Post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Комментарий в очереди',
+                'verbose_name_plural': 'Комментарии в очереди',
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pendingcomment',
+            index=models.Index(fields=['author', 'post'], name='pending_author_post_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_pendingcomment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Растёт, когда готовы миниатюра и варианты картинки', verbose_name='Версия картинки'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -19,6 +21,11 @@ class Group(models.Model):
         verbose_name='Адрес группы',
         unique=True,
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -55,15 +62,60 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False,
+    )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False,
+        help_text='JSON: ширина, высота, формат и файл каждого варианта',
+    )
+    image_version = models.PositiveIntegerField(
+        'Версия картинки',
+        default=0,
+        editable=False,
+        help_text='Растёт, когда готовы миниатюра и варианты картинки',
+    )
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
 
+        indexes = [
+            models.Index(
+                fields=['-created'],
+                name='post_created_idx'
+            ),
+            models.Index(
+                fields=['group', '-created'],
+                name='post_group_created_idx'
+            ),
+            models.Index(
+                fields=['author', '-created'],
+                name='post_author_created_idx'
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.text[:settings.POST_TEXT_SYMB_TO_DISPLAY_COUNT]
 
+    @property
+    def variants(self):
+        """Варианты картинки разной ширины и формата."""
+
+        try:
+            return json.loads(self.image_variants or '[]')
+        except ValueError:
+            return []
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -91,6 +143,13 @@ class Comment(CreatedModel):
         verbose_name = 'Комментарии'
         verbose_name_plural = 'Комментарии'
 
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -125,6 +184,115 @@ class Follow(models.Model):
                 name='user_cannot_be_equal_author'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляются сигналами через F()."""
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Число постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: запись на каждую пару
+    подписчик-пост, раскладывается при публикации поста."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(
+        'Дата публикации',
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created'],
+                name='timeline_user_created_idx'
+            ),
+        ]
+
+
+class PendingComment(CreatedModel):
+    """Принятый, но ещё не записанный очередью комментарий
+    (см. posts/comment_queue.py). created - время приёма."""
+
+    post = models.ForeignKey(
+        Post,
+        related_name='pending_comments',
+        verbose_name='Публикация',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='pending_comments',
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+    )
+    text = models.TextField(
+        verbose_name='Текст комментария',
+    )
+
+    class Meta:
+        ordering = ('pk',)
+        verbose_name = 'Комментарий в очереди'
+        verbose_name_plural = 'Комментарии в очереди'
+
+        indexes = [
+            models.Index(
+                fields=['author', 'post'],
+                name='pending_author_post_idx'
+            ),
+        ]
@@ -1,8 +1,182 @@
+import base64
+import binascii
+import json
+
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(obj, direction, key='created'):
+    """Непрозрачный токен курсора по ключу (created, id)."""
+
+    raw = json.dumps([getattr(obj, key).isoformat(), obj.pk, direction])
+    token = base64.urlsafe_b64encode(raw.encode())
+
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (created, id, направление) или None для битого токена."""
+
+    if not token:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created, pk, direction = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None
+
+    created = parse_datetime(created) if isinstance(created, str) else None
+    if created is None or not isinstance(pk, int):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+
+    return created, pk, direction
+
+
+# Строки за курсором по (key, pk) - диапазон по key без строк с той же
+# датой по эту сторону курсора: key <= даты и не (key = даты, pk >= pk)
+# для lt. С OR SQLite собирает строки двумя поисками и сортирует заново.
+AFTER_CURSOR = {'lt': ('lte', 'gte'), 'gt': ('gte', 'lte')}
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (created, id) без COUNT(*) и OFFSET.
+
+    Каждая страница - один запрос с диапазонным условием по индексу,
+    поэтому стоимость не зависит от глубины страницы. Поле даты
+    задаётся key, если лента сортируется по аннотации; descending=False
+    листает от старых записей к новым (комментарии).
+
+    Число записей неизвестно: count равен None, page_range пуст.
+    Пагинатор описывает только "окно" вокруг текущей страницы:
+    предыдущая, текущая и следующая, поэтому num_pages - от 1 до 3,
+    number - 1 для первой страницы ленты и 2 для остальных. Так
+    обычный Page (его требуют шаблоны и тесты) верно отвечает
+    на has_next/has_previous, а токены соседних страниц лежат
+    в next_cursor/previous_cursor. start_index/end_index страницы
+    считаются от окна, а не от начала ленты.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, key='created',
+                 descending=True):
+        order = '-' if descending else ''
+        super().__init__(
+            object_list.order_by(f'{order}{key}', f'{order}pk'),
+            per_page,
+        )
+        self.key = key
+        self.descending = descending
+        self.token = None
+        self._has_next = False
+        self._has_previous = False
+        self._rows = []
+
+    @property
+    def count(self):
+        return None
+
+    @property
+    def num_pages(self):
+        return 1 + self._has_previous + self._has_next
+
+    @property
+    def page_range(self):
+        return range(0)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(self._rows[-1], NEXT, self.key)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(self._rows[0], PREVIOUS, self.key)
+
+    def validate_number(self, number):
+        return number
+
+    def get_page(self, token):
+        """Страница по токену; битый токен ведёт на первую страницу."""
+
+        cursor = decode_cursor(token)
+        self.token = token if cursor else None
+
+        return self.page(cursor)
+
+    def rows_query(self, cursor=None):
+        """Запрос строк страницы: на одну больше per_page, чтобы узнать,
+        есть ли следующая. Обратный курсор читает строки задом наперёд."""
+
+        queryset = self.object_list
+        if cursor is not None:
+            created, pk, direction = cursor
+            forward, backward = (
+                ('lt', 'gt') if self.descending else ('gt', 'lt')
+            )
+            key_lookup, seen = AFTER_CURSOR[
+                forward if direction == NEXT else backward
+            ]
+            queryset = queryset.filter(
+                Q(**{f'{self.key}__{key_lookup}': created})
+                & ~Q(**{self.key: created, f'pk__{seen}': pk})
+            )
+            if direction != NEXT:
+                queryset = queryset.reverse()
+        return queryset[:self.per_page + 1]
+
+    def page(self, cursor=None):
+        rows = list(self.rows_query(cursor))
+        if cursor is None or cursor[2] == NEXT:
+            return self._window(rows, has_previous=cursor is not None)
+
+        if len(rows) <= self.per_page:
+            # Дошли до начала ленты - отдаём полноценную первую страницу.
+            self.token = None
+            return self.page()
+
+        self._rows = rows[:self.per_page][::-1]
+        self._has_next = True
+        self._has_previous = True
+
+        return self._get_page(self._rows, 2, self)
+
+    def _window(self, rows, has_previous):
+        self._rows = rows[:self.per_page]
+        self._has_next = len(rows) > self.per_page
+        self._has_previous = has_previous
+
+        return self._get_page(self._rows, 1 + has_previous, self)
+
+
+def feed_paginator(post_list, key='created'):
+    return CursorPaginator(post_list, settings.POSTS_AMOUNT, key)
+
+
+def paginator_custom(request, post_list, cursor=False, key='created'):
+    """Страница ленты.
+
+    С cursor=True лента листается по ?cursor=; старые ссылки
+    вида ?page=N продолжают работать через обычный Paginator.
+    """
 
+    if cursor and 'page' not in request.GET:
+        paginator = feed_paginator(post_list, key)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
 
-def paginator_custom(request, post_list):
     paginator = Paginator(post_list, settings.POSTS_AMOUNT)
     page_num = request.GET.get('page')
 
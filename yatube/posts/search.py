@@ -0,0 +1,207 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс хранит нормализованные (см. stemming.py) текст поста, название
+группы и имя автора. Бэкенд задаётся SEARCH_BACKEND, а если он
+не задан - выбирается по базе (VENDOR_BACKENDS): на SQLite это
+таблица FTS5 с ранжированием bm25, на других базах - запасной
+бэкенд на icontains без отдельного индекса.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemming import normalize, stems
+
+# Вес совпадения в тексте, названии группы и имени автора.
+WEIGHTS = (1.0, 0.5, 0.5)
+VENDOR_BACKENDS = {'sqlite': 'posts.search.SqliteFTSBackend'}
+FALLBACK_BACKEND = 'posts.search.LikeBackend'
+
+
+def author_name(user):
+    return ' '.join(filter(None, (user.username, user.get_full_name())))
+
+
+def document(post):
+    """Поля индекса для поста; group и author должны быть загружены."""
+
+    return (
+        normalize(post.text),
+        normalize(post.group.title if post.group_id else ''),
+        normalize(author_name(post.author)),
+    )
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса постов."""
+
+    # Есть ли индекс, который надо обновлять при изменении постов.
+    indexed = True
+
+    def index(self, posts):
+        """Добавляет или обновляет посты в индексе."""
+
+        raise NotImplementedError
+
+    def remove(self, pks):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        """pk найденных постов, самые релевантные первыми."""
+
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Посты queryset, подходящие под query, без предела числа.
+
+        Условие - подзапрос, а не список pk: частое слово не упрётся
+        в предел параметров запроса.
+        """
+
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Заново индексирует все посты, возвращает их число."""
+
+        self.clear()
+        posts = Post.objects.select_related('author', 'group').order_by()
+        total = 0
+        batch = []
+        for post in posts.iterator(chunk_size=settings.SEARCH_BATCH_SIZE):
+            batch.append(post)
+            if len(batch) == settings.SEARCH_BATCH_SIZE:
+                total += self.index(batch)
+                batch = []
+        if batch:
+            total += self.index(batch)
+        return total
+
+
+class SqliteFTSBackend(SearchBackend):
+    """Индекс в виртуальной таблице FTS5 (миграция 0015_post_search)."""
+
+    table = 'posts_search'
+
+    def index(self, posts):
+        rows = [(post.pk, *document(post)) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table}'
+                '(rowid, text, group_title, author_name) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+        return len(rows)
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(pk,) for pk in pks],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def match(self, query):
+        """Выражение MATCH: все слова запроса, каждое как префикс."""
+
+        terms = [term.replace('"', '""') for term in stems(query)]
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, query, limit):
+        match = self.match(query)
+        if not match:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s, %s), rowid DESC '
+                'LIMIT %s',
+                [match, *WEIGHTS, -1 if limit is None else limit],
+            )
+            return [pk for pk, in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        match = self.match(query)
+        if not match:
+            return queryset.none()
+
+        # RawSQL в pk__in оборачивается в лишние скобки, и SQLite
+        # берёт из подзапроса одну строку.
+        column = '{}.{}'.format(
+            connection.ops.quote_name(Post._meta.db_table),
+            connection.ops.quote_name(Post._meta.pk.column),
+        )
+        return queryset.extra(
+            where=[
+                f'{column} IN (SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s)'
+            ],
+            params=[match],
+        )
+
+
+class LikeBackend(SearchBackend):
+    """Поиск без индекса для баз без FTS5, свежие посты первыми."""
+
+    indexed = False
+
+    def index(self, posts):
+        return len(posts)
+
+    def remove(self, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def filter(self, queryset, query):
+        words = query.split()
+        if not words:
+            return queryset.none()
+
+        condition = Q()
+        for word in words:
+            condition &= (
+                Q(text__icontains=word)
+                | Q(group__title__icontains=word)
+                | Q(author__username__icontains=word)
+            )
+        return queryset.filter(condition)
+
+    def search(self, query, limit):
+        pks = self.filter(Post.objects.all(), query).values_list(
+            'pk', flat=True,
+        )
+        return list(pks[:limit] if limit is not None else pks)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = settings.SEARCH_BACKEND or VENDOR_BACKENDS.get(
+        connection.vendor, FALLBACK_BACKEND,
+    )
+    return import_string(path)()
+
+
+def get_index():
+    """Бэкенд, если его индекс нужно обновлять, иначе None."""
+
+    backend = get_backend()
+    return backend if backend.indexed else None
+
+
+def search_posts(query, limit=None):
+    return get_backend().search(query, limit)
@@ -0,0 +1,197 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Распределения неравномерные, как в живом сервисе: немногие авторы
+пишут большую часть постов и собирают большую часть подписчиков,
+немногие группы популярны, свежие посты комментируют чаще старых.
+Строки вставляются пачками через bulk_create; производные данные
+(счётчики, ленты подписок, поисковый индекс) строятся в конце.
+"""
+
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from . import counters, feed_cache, search, timeline
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .transfer import preserve_timestamps
+
+USERNAME_PREFIX = 'bench_'
+WORDS = (
+    'пост котики погода город работа отпуск книга кино музыка проект '
+    'код джанго питон база индекс запрос кеш лента группа подписка '
+    'утро вечер новости фото картинка дорога море горы друзья семья'
+).split()
+
+
+def skewed(rng, count, skew):
+    """Номер от 0 до count - 1, малые номера выпадают чаще.
+
+    При skew = 1 распределение равномерное, чем больше skew,
+    тем сильнее перекос к началу (степенной закон).
+    """
+
+    return min(int(count * rng.random() ** skew), count - 1)
+
+
+def text(rng, low=5, high=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+class Seeder:
+    def __init__(self, rng, batch_size, days, write):
+        self.rng = rng
+        self.batch_size = batch_size
+        self.write = write
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=days)
+
+    def batches(self, total, build):
+        """Вызывает build(номер) total раз, отдаёт списки по batch_size."""
+
+        batch = []
+        for number in range(total):
+            batch.append(build(number))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert(self, model, total, build, **options):
+        """Вставляет total строк, возвращает запрос их pk по возрастанию.
+
+        pk читаются из базы: последовательность может идти с пропусками,
+        и bulk_create не на всех базах возвращает pk.
+        """
+
+        before = model.objects.order_by('-pk').values_list(
+            'pk', flat=True,
+        ).first() or 0
+
+        done = 0
+        with preserve_timestamps(model):
+            for batch in self.batches(total, build):
+                model.objects.bulk_create(batch, **options)
+                done += len(batch)
+                self.write(f'{model._meta.model_name}: {done}/{total}')
+
+        return model.objects.filter(pk__gt=before).order_by(
+            'pk'
+        ).values_list('pk', flat=True)
+
+    def moment(self, number, total):
+        """Время создания number-й из total записей, по возрастанию."""
+
+        span = (self.now - self.start) * (number + self.rng.random()) / total
+        return self.start + span
+
+    def run(self, users, groups, posts, comments, follows, skew):
+        rng = self.rng
+        unusable = make_password(None)
+        tag = f'{self.now:%Y%m%d%H%M%S}'
+
+        user_ids = list(self.insert(User, users, lambda i: User(
+            username=f'{USERNAME_PREFIX}{tag}_{i}',
+            password=unusable,
+            date_joined=self.start,
+        )))
+        group_ids = list(self.insert(Group, groups, lambda i: Group(
+            title=f'Группа {i}',
+            description=text(rng, 5, 20),
+            slug=f'{USERNAME_PREFIX}{tag}_{i}',
+        )))
+        user_count = len(user_ids)
+        group_count = len(group_ids)
+
+        def post(i):
+            group = None
+            if group_count and rng.random() < 0.7:
+                group = group_ids[skewed(rng, group_count, skew)]
+            created = self.moment(i, posts)
+            return Post(
+                author_id=user_ids[skewed(rng, user_count, skew)],
+                group_id=group,
+                text=text(rng),
+                created=created,
+                updated=created,
+            )
+
+        post_ids = list(self.insert(Post, posts, post))
+        post_count = len(post_ids)
+
+        def comment(i):
+            # Свежие посты (большие pk) комментируют чаще.
+            post_id = post_ids[-1 - skewed(rng, post_count, skew)]
+            return Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text=text(rng, 1, 20),
+                created=self.now,
+            )
+
+        if post_count:
+            self.insert(Comment, comments, comment)
+
+        def follow(i):
+            author = skewed(rng, user_count, skew)
+            user = rng.randrange(user_count)
+            if user == author:
+                user = (user + 1) % user_count
+            return Follow(user_id=user_ids[user], author_id=user_ids[author])
+
+        if user_count > 1:
+            self.insert(Follow, follows, follow, ignore_conflicts=True)
+
+        self.derive(user_ids)
+
+    def derive(self, authors):
+        """Счётчики, ленты подписок и поисковый индекс новых строк."""
+
+        self.write('Пересчёт счётчиков')
+        counters.recount()
+        timeline.reset_pull_authors()
+        pulled = timeline.pull_authors()
+
+        self.write('Раскладка лент подписок')
+        for author_id in authors:
+            if author_id in pulled:
+                continue
+            followers = list(
+                Follow.objects.filter(author_id=author_id).values_list(
+                    'user_id', flat=True,
+                )
+            )
+            if not followers:
+                continue
+            recent = Post.objects.filter(author_id=author_id).order_by(
+                '-created'
+            ).values_list('pk', 'created')[:settings.TIMELINE_BACKFILL_POSTS]
+            TimelineEntry.objects.bulk_create(
+                (
+                    TimelineEntry(user_id=user_id, post_id=pk, created=created)
+                    for pk, created in recent
+                    for user_id in followers
+                ),
+                ignore_conflicts=True,
+            )
+
+        self.write('Поисковый индекс')
+        search.get_backend().rebuild()
+        feed_cache.bump(feed_cache.INDEX)
+
+
+def seed(users, groups, posts, comments, follows, skew=3, seed=None,
+         batch_size=5000, days=365, write=lambda line: None):
+    Seeder(random.Random(seed), batch_size, days, write).run(
+        users, groups, posts, comments, follows, skew,
+    )
+
+
+def clear():
+    """Удаляет сгенерированных пользователей (с их постами) и группы."""
+
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    Group.objects.filter(slug__startswith=USERNAME_PREFIX).delete()
@@ -0,0 +1,233 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поле не загружено (.only()/.defer()): group_id - группу
+# не пересчитываем, имя автора или группы - не сравниваем.
+UNLOADED = object()
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._counted_group_id = instance.__dict__.get(
+        'group_id',
+        UNLOADED,
+    )
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feeds_on_save(sender, instance, **kwargs):
+    old_group_id = instance._counted_group_id
+    if old_group_id is UNLOADED:
+        old_group_id = None
+    feed_cache.bump(*feed_cache.post_scopes(instance, old_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feeds_on_delete(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feeds_on_comment(sender, instance, **kwargs):
+    # Число комментариев выводится в карточке поста.
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_feeds_on_follow(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.scope('author', instance.author_id))
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+    elif instance._counted_group_id in (UNLOADED, instance.group_id):
+        return
+    elif instance._counted_group_id is not None:
+        counters.bump(
+            Group.objects.filter(pk=instance._counted_group_id),
+            'posts_count',
+            -1,
+        )
+
+    if instance.group_id is not None:
+        counters.bump(
+            Group.objects.filter(pk=instance.group_id),
+            'posts_count',
+            1,
+        )
+    instance._counted_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    if instance.group_id is not None:
+        counters.bump(
+            Group.objects.filter(pk=instance.group_id),
+            'posts_count',
+            -1,
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(
+            Post.objects.filter(pk=instance.post_id),
+            'comments_count',
+            1,
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump(
+        Post.objects.filter(pk=instance.post_id),
+        'comments_count',
+        -1,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline_on_follow(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow_changed(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def purge_timeline_on_unfollow(sender, instance, **kwargs):
+    timeline.purge(instance.user_id, instance.author_id)
+    timeline.follow_changed(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    index = search.get_index()
+    if index is not None:
+        # Автор и группа одним запросом, а не ленивыми обращениями
+        # к полям поста.
+        index.index(
+            Post.objects.select_related('author', 'group').filter(
+                pk=instance.pk,
+            )
+        )
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    index = search.get_index()
+    if index is not None:
+        index.remove([instance.pk])
+
+
+# Поля, которые выводятся в карточках постов и попадают в индекс поиска.
+GROUP_FIELDS = ('title', 'slug')
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def loaded(instance, fields):
+    return {
+        field: instance.__dict__[field]
+        for field in fields if field in instance.__dict__
+    }
+
+
+def changed(instance, fields):
+    """Поля, изменённые с загрузки (post_init).
+
+    Не загруженные (.only(), кешированный пользователь) и не присвоенные
+    поля не сравниваются: иначе их чтение стоило бы запроса, а каждое
+    сохранение выглядело бы правкой.
+    """
+
+    return {
+        field for field, value in loaded(instance, fields).items()
+        if instance._remembered.get(field, UNLOADED) != value
+    }
+
+
+@receiver(post_init, sender=Group)
+def remember_group(sender, instance, **kwargs):
+    instance._remembered = loaded(instance, GROUP_FIELDS)
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    fields = set() if created else changed(instance, GROUP_FIELDS)
+    instance._remembered = loaded(instance, GROUP_FIELDS)
+    if not fields:
+        return
+
+    index = search.get_index()
+    if index is not None and 'title' in fields:
+        index.index(instance.posts.select_related('author', 'group'))
+
+    # Ссылка на группу есть в карточках её постов во всех лентах.
+    authors = instance.posts.values_list('author_id', flat=True).distinct()
+    feed_cache.bump(
+        feed_cache.INDEX,
+        feed_cache.scope('group', instance.pk),
+        *(feed_cache.scope('author', pk) for pk in authors),
+    )
+
+
+@receiver(post_init, sender=User)
+def remember_author(sender, instance, **kwargs):
+    instance._remembered = loaded(instance, AUTHOR_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, **kwargs):
+    fields = set() if created else changed(instance, AUTHOR_FIELDS)
+    instance._remembered = loaded(instance, AUTHOR_FIELDS)
+    if not fields:
+        return
+
+    index = search.get_index()
+    if index is not None:
+        index.index(instance.posts.select_related('author', 'group'))
+
+    # Имя автора есть в карточках его постов во всех лентах.
+    groups = instance.posts.filter(group__isnull=False).values_list(
+        'group_id', flat=True,
+    ).distinct()
+    feed_cache.bump(
+        feed_cache.INDEX,
+        feed_cache.scope('author', instance.pk),
+        *(feed_cache.scope('group', pk) for pk in groups),
+    )
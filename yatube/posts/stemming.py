@@ -0,0 +1,38 @@
+"""Нормализация текста для поискового индекса.
+
+Слова приводятся к основе стеммером Snowball: кириллица - русским,
+латиница - английским. Одна и та же функция обрабатывает и документы,
+и запросы, поэтому «картинками» находит «картинка».
+"""
+
+import re
+from functools import lru_cache
+
+import snowballstemmer
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+_russian = snowballstemmer.stemmer('russian')
+_english = snowballstemmer.stemmer('english')
+
+
+# Словарь текстов невелик, а стеммер на чистом Python медленный.
+@lru_cache(maxsize=100_000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if CYRILLIC_RE.search(word):
+        return _russian.stemWord(word)
+    if word.isascii() and word.isalpha():
+        return _english.stemWord(word)
+    return word
+
+
+def stems(text):
+    """Основы слов текста в исходном порядке."""
+
+    return [stem(word) for word in WORD_RE.findall(text or '')]
+
+
+def normalize(text):
+    return ' '.join(stems(text))
@@ -0,0 +1,120 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import stampede
+from posts import feed_cache
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, name, page, pk):
+        self.nodelist = nodelist
+        self.name = name
+        self.page = page
+        self.pk = pk
+
+    def render(self, context):
+        page = self.page.resolve(context)
+        pk = self.pk.resolve(context) if self.pk else None
+        scope = feed_cache.scope(self.name.resolve(context), pk)
+
+        page_key = [getattr(page.paginator, 'token', None), page.number]
+        # Пока один запрос рендерит новое поколение ленты, остальные
+        # отдают последнюю версию этой страницы.
+        return stampede.get_or_compute(
+            make_template_fragment_key(
+                'feed', [scope, feed_cache.generation(scope), *page_key],
+            ),
+            lambda: self.nodelist.render(context),
+            settings.FEED_CACHE_TIMEOUT,
+            stale_key=make_template_fragment_key(
+                'feed:latest', [scope, *page_key],
+            ),
+        )
+
+
+@register.tag('feedcache')
+def do_feedcache(parser, token):
+    """Кеширует страницу ленты до изменения её постов.
+
+    {% feedcache 'index' page_obj %}...{% endfeedcache %}
+    {% feedcache 'group' page_obj group.pk %}...{% endfeedcache %}
+    """
+
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) not in (3, 4):
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя ленты, страницу и необязательный id'
+        )
+
+    return FeedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        parser.compile_filter(bits[3]) if len(bits) == 4 else None,
+    )
+
+
+def article_key(post, show_group_link, show_profile_link):
+    """Ключ карточки поста: меняется при правке поста, его счётчиков,
+    готовности картинки, имени автора и группы. group и author
+    должны быть загружены."""
+
+    author = post.author
+    stats = getattr(author, 'stats', None)
+    group = post.group
+    return make_template_fragment_key(
+        'article',
+        [
+            post.pk,
+            post.updated.timestamp() if post.updated else None,
+            post.comments_count,
+            post.image_version,
+            getattr(stats, 'followers_count', None),
+            author.username,
+            author.get_full_name(),
+            group.slug if group else None,
+            group.title if group else None,
+            int(bool(show_group_link)),
+            int(bool(show_profile_link)),
+        ],
+    )
+
+
+@register.simple_tag
+def post_articles(posts, show_group_link=False, show_profile_link=False):
+    """HTML карточек постов страницы ленты.
+
+    {% post_articles page_obj show_group_link=True as articles %}
+
+    Карточка поста одинакова во всех лентах, поэтому кешируется
+    отдельно: все карточки страницы читаются одним get_many,
+    рендерятся только промахи.
+    """
+
+    keys = [
+        article_key(post, show_group_link, show_profile_link)
+        for post in posts
+    ]
+    cached = cache.get_many(keys)
+
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cached:
+            missing[key] = render_to_string('includes/article.html', {
+                'post': post,
+                'SHOW_GROUP_LINK': show_group_link,
+                'SHOW_PROFILE_LINK': show_profile_link,
+            })
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+        cached.update(missing)
+
+    return [mark_safe(cached[key]) for key in keys]
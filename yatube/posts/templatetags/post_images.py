@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail_url(image):
+    """URL миниатюры картинки поста или заглушки, пока она готовится."""
+
+    return thumbnails.thumbnail_url(image) or thumbnails.placeholder_url()
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post):
+    """Картинка поста с вариантами для srcset."""
+
+    sources = variants.sources(post)
+    return {
+        'src': post_thumbnail_url(post.image),
+        'sources': [source for source in sources if not source['fallback']],
+        'fallback': next(
+            (source for source in sources if source['fallback']),
+            None,
+        ),
+    }
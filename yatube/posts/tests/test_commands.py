@@ -0,0 +1,220 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..benchmark import percentile, url_names
+from ..management.commands.audit_indexes import find_problems
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..search import search_posts
+from ..seeding import USERNAME_PREFIX, skewed
+
+
+class AuditIndexesTest(TestCase):
+    def test_view_queries_use_indexes(self):
+        """Запросы представлений не делают полных просмотров"""
+
+        out = StringIO()
+        call_command('audit_indexes', stdout=out)
+
+        self.assertIn('posts:index: OK', out.getvalue())
+        self.assertIn('posts:index (next page): OK', out.getvalue())
+
+    def test_find_problems(self):
+        plans = {
+            '2 0 0 SCAN posts_post': 1,
+            '2 0 0 SCAN TABLE posts_post': 1,
+            '5 0 0 USE TEMP B-TREE FOR ORDER BY': 1,
+            'Seq Scan on posts_post  (cost=0.00..1.00 rows=1 width=4)': 1,
+            '7 0 0 SCAN posts_post USING INDEX post_created_idx': 0,
+            '58 0 0 USE TEMP B-TREE FOR RIGHT PART OF ORDER BY': 0,
+        }
+
+        for plan, expected in plans.items():
+            with self.subTest(plan=plan):
+                self.assertEqual(len(find_problems(plan)), expected)
+
+
+class SeedBenchmarkTest(TestCase):
+    def seed(self, *args):
+        call_command(
+            'seed_benchmark',
+            '--users=20', '--groups=3', '--posts=200', '--comments=300',
+            '--follows=60', '--seed=1', '--batch-size=50', *args,
+            stdout=StringIO(),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_creates_rows_and_derived_data(self):
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertTrue(search_posts('пост'))
+
+        author = User.objects.get(username__endswith='_0')
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+
+    def test_popularity_is_skewed(self):
+        self.seed()
+
+        counts = sorted(
+            (user.posts.count() for user in User.objects.all()),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 200 / 20 * 3)
+
+    def test_posts_ordered_by_time(self):
+        self.seed()
+
+        created = list(
+            Post.objects.order_by('pk').values_list('created', flat=True)
+        )
+        self.assertEqual(created, sorted(created))
+
+    def test_clear(self):
+        self.seed()
+        self.seed('--clear', '--users=0', '--groups=0', '--posts=0')
+
+        self.assertFalse(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).exists()
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_pk_gaps(self):
+        """Пропуски в последовательности pk не ломают ссылки"""
+
+        User.objects.create_user(username='removed').delete()
+        self.seed()
+
+        users = set(User.objects.values_list('pk', flat=True))
+        authors = set(Post.objects.values_list('author_id', flat=True))
+        self.assertLessEqual(authors, users)
+
+    def test_skewed(self):
+        rng = random.Random(1)
+        values = [skewed(rng, 10, 3) for _ in range(1000)]
+
+        self.assertTrue(all(0 <= value < 10 for value in values))
+        self.assertGreater(values.count(0), values.count(9) * 5)
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            'benchmark', '--requests=2', '--warmup=0', *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_report_covers_every_url(self):
+        path = os.path.join(self.dir, 'report.json')
+        self.benchmark(f'--output={path}')
+
+        with open(path) as file:
+            report = json.load(file)
+        measured = {row['url'] for row in report['results']}
+        self.assertEqual(measured, {name for name, _ in url_names()})
+        self.assertIn('posts:add_comment', measured)
+        self.assertIn('users:logout', measured)
+
+        detail = next(
+            row for row in report['results']
+            if row['url'] == 'posts:post_detail' and row['client'] == 'user'
+        )
+        self.assertEqual(detail['status'], 200)
+        self.assertGreater(detail['queries'], 0)
+        self.assertLessEqual(detail['p50_ms'], detail['p99_ms'])
+
+    def test_leaves_data_unchanged(self):
+        """Комментарии и подписки замеров откатываются"""
+
+        def rows():
+            return [
+                model.objects.count()
+                for model in (Comment, Follow, TimelineEntry)
+            ]
+
+        before = rows()
+        self.benchmark(
+            '--url=posts:add_comment', '--url=posts:profile_follow',
+        )
+
+        self.assertEqual(rows(), before)
+
+    def test_compare(self):
+        path = os.path.join(self.dir, 'old.json')
+        self.benchmark('--url=posts:index', f'--output={path}')
+
+        output = self.benchmark('--url=posts:index', f'--compare={path}')
+
+        self.assertIn('p50', output)
+        self.assertIn('->', output)
+
+    def test_session_modes(self):
+        path = os.path.join(self.dir, 'sessions.json')
+        self.benchmark('--sessions', f'--output={path}')
+
+        with open(path) as file:
+            report = json.load(file)
+        rows = {
+            (row['session'], row['url']): row for row in report['results']
+        }
+        self.assertEqual(set(rows), {
+            (mode, url)
+            for mode in settings.SESSION_ENGINES
+            for url in ('posts:index', 'posts:follow_index')
+        })
+        for url in ('posts:index', 'posts:follow_index'):
+            self.assertEqual(rows['db', url]['session_queries'], 1)
+            self.assertEqual(rows['cached_db', url]['session_queries'], 0)
+            self.assertEqual(
+                rows['signed_cookies', url]['session_queries'], 0,
+            )
+
+    def test_unknown_session_mode(self):
+        with self.assertRaises(CommandError):
+            self.benchmark('--sessions', 'redis')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from .. import comment_queue, feed_cache
+from ..models import Comment, PendingComment, Post, User
+
+
+class AddCommentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def add_comment(self, post_id, text='Комментарий'):
+        return self.client.post(
+            reverse('posts:add_comment', args=(post_id,)),
+            {'text': text},
+        )
+
+    def test_missing_post(self):
+        response = self.add_comment(self.post.pk + 100)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_sync_write(self):
+        generation = feed_cache.generation(feed_cache.INDEX)
+
+        self.add_comment(self.post.pk)
+
+        self.assertTrue(Comment.objects.filter(
+            post=self.post, author=self.reader, text='Комментарий',
+        ).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertNotEqual(
+            feed_cache.generation(feed_cache.INDEX), generation,
+        )
+
+    @override_settings(COMMENT_QUEUE_ASYNC=True)
+    def test_read_your_writes(self):
+        """Автор видит комментарий из очереди, другие - нет"""
+
+        # В TestCase on_commit не срабатывает: комментарий остаётся
+        # в очереди на всё время теста.
+        self.add_comment(self.post.pk, 'Ещё в очереди')
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+
+        self.assertFalse(Comment.objects.exists())
+        response = self.client.get(url)
+        self.assertContains(response, 'Ещё в очереди')
+        self.assertContains(response, 'публикуется')
+
+        self.client.force_login(self.author)
+        self.assertNotContains(self.client.get(url), 'Ещё в очереди')
+
+    @override_settings(COMMENT_QUEUE_ASYNC=True)
+    def test_pending_survives_restart(self):
+        """Принятый комментарий хранится в базе и записывается
+        с временем приёма"""
+
+        self.add_comment(self.post.pk, 'Принят')
+        pending = PendingComment.objects.get()
+        accepted = pending.created - timedelta(minutes=5)
+        PendingComment.objects.update(created=accepted)
+
+        out = StringIO()
+        call_command('flush_comments', stdout=out)
+
+        self.assertIn('Записано комментариев: 1', out.getvalue())
+        comment = Comment.objects.get()
+        self.assertEqual(
+            (comment.text, comment.author, comment.created),
+            ('Принят', self.reader, accepted),
+        )
+        self.assertFalse(PendingComment.objects.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_flush_batch(self):
+        other = Post.objects.create(text='Другой', author=self.author)
+        items = [
+            {'post_id': post_id, 'author_id': self.reader.pk, 'text': text}
+            for post_id, text in (
+                (self.post.pk, 'Раз'),
+                (self.post.pk, 'Два'),
+                (other.pk, 'Три'),
+                (other.pk + 100, 'Удалённый пост'),
+            )
+        ]
+
+        with self.assertNumQueries(4):
+            written = comment_queue.flush(items)
+
+        self.assertEqual(written, 3)
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(other.comments_count, 1)
+
+
+@override_settings(COMMENT_QUEUE_ASYNC=True, COMMENT_FLUSH_INTERVAL=0.05)
+class CommentWorkerTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def test_worker_writes_batches(self):
+        for number in range(5):
+            comment_queue.submit(self.post, self.author.pk, f'Ком {number}')
+
+        comment_queue.join()
+
+        self.assertEqual(Comment.objects.count(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
+        self.assertEqual(
+            comment_queue.pending_comments(self.author, self.post.pk), [],
+        )
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='testslug',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост',
+            author=self.author,
+            group=self.group,
+        )
+        self.urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+
+    def test_not_modified(self):
+        """Повторный запрос неизменной страницы получает 304"""
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage', response['Cache-Control'])
+
+                response = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=response['ETag'],
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+
+    def test_comment_changes_etag(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+
+        Comment.objects.create(
+            post=self.post,
+            author=self.reader,
+            text='Комментарий',
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_user_specific_pages(self):
+        """Страница пользователя не совпадает с анонимной и не публична"""
+
+        anonymous = {url: self.client.get(url)['ETag'] for url in self.urls}
+
+        self.client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=anonymous[url],
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
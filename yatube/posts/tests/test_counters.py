@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import recount
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='testslug'
+        )
+        cls.group2 = Group.objects.create(
+            title='Вторая группа',
+            description='Тестовое описание',
+            slug='testslug2'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Посты считаются у автора и группы, в том числе при переносе"""
+
+        post = Post.objects.create(
+            text='Пост',
+            author=self.author,
+            group=self.group,
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 1)
+
+        post.delete()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post,
+            author=self.reader,
+            text='Комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """manage.py recount чинит разошедшиеся счётчики"""
+
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ok')
+        Post.objects.filter(pk=post.pk).update(comments_count=10)
+        UserStats.objects.filter(user=self.author).delete()
+
+        self.assertEqual(recount(dry_run=True)['posts'], 1)
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('posts: 1', out.getvalue())
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(recount(), {'posts': 0, 'groups': 0, 'users': 0})
+
+    def test_profile_shows_counter(self):
+        """Профиль берёт число постов из счётчика"""
+
+        Post.objects.create(text='Пост', author=self.author)
+
+        response = self.client.get(f'/profile/{self.author.username}/')
+        self.assertContains(response, 'Всего постов: 1')
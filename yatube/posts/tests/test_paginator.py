@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.test import Client, TestCase
+
+from ..models import Post, User
+from ..paginator_custom import (CursorPaginator, NEXT, decode_cursor,
+                                encode_cursor)
+
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tester')
+
+        for i in range(POSTS_COUNT):
+            Post.objects.create(text=f'Пост #{i + 1}', author=cls.user)
+
+        cls.expected = list(
+            Post.objects.order_by('-created', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def get_page(self, token):
+        paginator = CursorPaginator(Post.objects.all(), settings.POSTS_AMOUNT)
+        return paginator.get_page(token)
+
+    def test_walk_forward_and_back(self):
+        """Листаем ленту вперёд до конца и обратно без дублей"""
+
+        pages = [self.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].paginator.next_cursor))
+
+        seen = [post.pk for page in pages for post in page]
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = self.get_page(page.paginator.previous_cursor)
+            self.assertEqual(
+                [post.pk for post in page],
+                [post.pk for post in expected_page]
+            )
+
+    def test_equal_dates(self):
+        """Посты с одной датой на границе страниц не теряются"""
+
+        Post.objects.update(created=Post.objects.first().created)
+        expected = list(
+            Post.objects.order_by('-pk').values_list('pk', flat=True)
+        )
+
+        pages = [self.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].paginator.next_cursor))
+        self.assertEqual(
+            [post.pk for page in pages for post in page], expected,
+        )
+
+        previous = self.get_page(pages[-1].paginator.previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
+
+    def test_one_query_per_page(self):
+        """Глубокая страница - один запрос, без COUNT"""
+
+        page = self.get_page(None)
+        with self.assertNumQueries(1):
+            page = self.get_page(page.paginator.next_cursor)
+            self.assertEqual(len(page), settings.POSTS_AMOUNT)
+
+    def test_unknown_totals(self):
+        """Число записей неизвестно, но не ломает Page"""
+
+        page = self.get_page(None)
+        page = self.get_page(page.paginator.next_cursor)
+
+        self.assertIsNone(page.paginator.count)
+        self.assertEqual(list(page.paginator.page_range), [])
+        self.assertTrue(page.has_other_pages())
+        page.start_index()
+        page.end_index()
+        self.assertEqual(len(page), settings.POSTS_AMOUNT)
+
+    def test_broken_cursor_gives_first_page(self):
+        """Битый токен ведёт на первую страницу"""
+
+        for token in ('', 'garbage', '!!!', 'WyJ4Il0'):
+            with self.subTest(token=token):
+                page = self.get_page(token)
+                self.assertEqual(page[0].pk, self.expected[0])
+
+    def test_cursor_roundtrip(self):
+        post = Post.objects.first()
+        cursor = decode_cursor(encode_cursor(post, NEXT))
+
+        self.assertEqual(cursor, (post.created, post.pk, NEXT))
+
+    def test_views_use_cursor(self):
+        """Ленты отдают ссылки ?cursor= и принимают старый ?page="""
+
+        client = Client()
+        urls = ('/', f'/profile/{self.user.username}/')
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                paginator = response.context['page_obj'].paginator
+                self.assertTrue(paginator.is_cursor)
+                self.assertContains(
+                    response,
+                    f'?cursor={paginator.next_cursor}'
+                )
+
+                response = client.get(url, {'cursor': paginator.next_cursor})
+                self.assertEqual(
+                    response.context['page_obj'][0].pk,
+                    self.expected[settings.POSTS_AMOUNT]
+                )
+
+                response = client.get(url, {'page': 2})
+                self.assertEqual(
+                    response.context['page_obj'].number,
+                    2
+                )
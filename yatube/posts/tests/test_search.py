@@ -0,0 +1,168 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, User
+from ..search import search_posts
+from ..stemming import normalize
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='tolstoy',
+            first_name='Лев',
+        )
+        cls.group = Group.objects.create(
+            title='Котики',
+            description='Тестовое описание',
+            slug='cats',
+        )
+
+    def test_normalize(self):
+        self.assertEqual(normalize('Картинками, картинки!'), 'картинк картинк')
+        self.assertEqual(normalize('Running posts'), 'run post')
+
+    def test_stemmed_search(self):
+        """Поиск находит другие формы слова и ранжирует по тексту"""
+
+        in_text = Post.objects.create(
+            text='Фотографии котиков',
+            author=self.author,
+        )
+        in_group = Post.objects.create(
+            text='Просто пост',
+            author=self.author,
+            group=self.group,
+        )
+        Post.objects.create(text='Про собак', author=self.author)
+
+        self.assertEqual(search_posts('котик'), [in_text.pk, in_group.pk])
+        self.assertEqual(search_posts('фотографию'), [in_text.pk])
+        self.assertEqual(search_posts('лев собака'), [
+            Post.objects.get(text='Про собак').pk,
+        ])
+        self.assertEqual(search_posts('"*'), [])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке поста, группы и автора"""
+
+        group = Group.objects.create(title='Кошки', slug='kitties')
+        post = Post.objects.create(
+            text='Черновик',
+            author=self.author,
+            group=group,
+        )
+
+        post.text = 'Чистовик'
+        post.save()
+        self.assertEqual(search_posts('черновик'), [])
+        self.assertEqual(search_posts('чистовик'), [post.pk])
+
+        group.title = 'Пёсики'
+        group.save()
+        self.assertEqual(search_posts('песик'), [post.pk])
+
+        author = AuthUser.objects.get(pk=self.author.pk)
+        author.last_name = 'Толстой'
+        author.save()
+        self.assertEqual(search_posts('толстого'), [post.pk])
+
+        post.delete()
+        self.assertEqual(search_posts('чистовик'), [])
+
+    def test_rebuild(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn('Проиндексировано постов: 1', out.getvalue())
+        self.assertEqual(search_posts('пост'), [post.pk])
+
+    def test_search_page(self):
+        """Страница поиска листается и сохраняет запрос в ссылках"""
+
+        for i in range(12):
+            Post.objects.create(text=f'Пост номер {i}', author=self.author)
+
+        response = self.client.get(reverse('posts:search'), {'q': 'пост'})
+
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D1%81%D1%82&amp;page=2')
+
+        response = self.client.get(
+            reverse('posts:search'),
+            {'q': 'пост', 'page': 2},
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_admin_uses_index(self):
+        post = Post.objects.create(text='Котики', author=self.author)
+        Post.objects.create(text='Собаки', author=self.author)
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'),
+            {'q': 'котик'},
+        )
+
+        self.assertEqual(
+            [obj.pk for obj in response.context['cl'].result_list],
+            [post.pk],
+        )
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_admin_filters_by_subquery(self):
+        """Админка находит все посты подзапросом, а не списком pk"""
+
+        posts = [
+            Post.objects.create(text=f'Котики {i}', author=self.author)
+            for i in range(3)
+        ]
+
+        fts = search.SqliteFTSBackend().filter(Post.objects.all(), 'котик')
+        self.assertIn('MATCH', str(fts.query))
+        self.assertCountEqual(fts, posts)
+
+        like = search.LikeBackend().filter(Post.objects.all(), 'Котики')
+        self.assertCountEqual(like, posts)
+
+        for backend in (search.SqliteFTSBackend(), search.LikeBackend()):
+            self.assertFalse(backend.filter(Post.objects.all(), '"*'))
+
+
+class SearchBackendTest(TestCase):
+    def setUp(self):
+        search.get_backend.cache_clear()
+        self.addCleanup(search.get_backend.cache_clear)
+
+    def test_backend_by_vendor(self):
+        self.assertIsInstance(search.get_backend(), search.SqliteFTSBackend)
+
+        search.get_backend.cache_clear()
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertIsInstance(search.get_backend(), search.LikeBackend)
+
+    @override_settings(SEARCH_BACKEND='posts.search.LikeBackend')
+    def test_no_index_without_fts(self):
+        """Без индекса сохранение поста не пишет в таблицу FTS"""
+
+        author = User.objects.create_user(username='author')
+        with mock.patch.object(search.SqliteFTSBackend, 'index') as index:
+            post = Post.objects.create(text='Котики', author=author)
+            post.delete()
+            Post.objects.create(text='Котики', author=author)
+
+        index.assert_not_called()
+        self.assertIsNone(search.get_index())
+        self.assertEqual(len(search_posts('Котики')), 1)
@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .. import thumbnails, variants
+from ..models import Post, User
+from .create_image import create_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tester')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=create_image(),
+        )
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры нет, страница отдаёт заглушку"""
+
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+
+        self.assertIsNone(thumbnails.thumbnail_url(self.post.image))
+        self.assertContains(self.client.get(url), 'img/placeholder.svg')
+
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+
+        thumbnail = thumbnails.thumbnail_url(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        self.assertContains(self.client.get(url), thumbnail)
+
+    def test_ready_thumbnail_refreshes_feed(self):
+        """Готовая миниатюра сбрасывает закешированную карточку"""
+
+        self.client.get(reverse('posts:index'))
+        thumbnails.generate(self.post.image.name)
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            thumbnails.thumbnail_url(self.post.image)
+        )
+
+    def test_cached_name_matches_sorl(self):
+        """Готовая миниатюра ищется под тем же именем, что создаёт sorl"""
+
+        name = self.post.image.name
+        for overrides in (
+            {},
+            {'THUMBNAIL_PRESERVE_FORMAT': True},
+            {'THUMBNAIL_PROGRESSIVE': False},
+        ):
+            with self.subTest(**overrides), override_settings(**overrides):
+                created = get_thumbnail(
+                    name, thumbnails.GEOMETRY, **thumbnails.OPTIONS,
+                )
+                cached = thumbnails.backend.get_cached_thumbnail(
+                    name, thumbnails.GEOMETRY, **thumbnails.OPTIONS,
+                )
+                self.assertIsNotNone(cached)
+                self.assertEqual(cached.name, created.name)
+
+    def test_in_memory_database_not_in_background(self):
+        """С SQLite в памяти фоновый поток не трогает тестовую базу"""
+
+        self.assertFalse(thumbnails.in_background())
+
+    def test_ready_thumbnail_keeps_updated(self):
+        """Готовая миниатюра меняет версию картинки, а не время правки"""
+
+        updated = self.post.updated
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.updated, updated)
+        self.assertEqual(self.post.image_version, 1)
+
+    def test_placeholder_retries(self):
+        """Заглушка снова ставит миниатюру в очередь, но не чаще
+        THUMBNAIL_RETRY_INTERVAL"""
+
+        on_commit = mock.patch(
+            'django.db.transaction.on_commit', lambda func: func(),
+        )
+        with mock.patch.object(thumbnails, 'generate') as generate, on_commit:
+            self.assertIsNone(thumbnails.thumbnail_url(self.post.image))
+            self.assertIsNone(thumbnails.thumbnail_url(self.post.image))
+            generate.assert_called_once_with(self.post.image.name)
+
+            cache.delete(thumbnails.SCHEDULED_KEY.format(self.post.image.name))
+            thumbnails.thumbnail_url(self.post.image)
+            self.assertEqual(generate.call_count, 2)
+
+    def test_warm_thumbnails_command(self):
+        out = StringIO()
+        call_command('warm_thumbnails', workers=1, stdout=out)
+
+        self.assertIn('Миниатюр готово: 1', out.getvalue())
+        self.assertIsNotNone(thumbnails.thumbnail_url(self.post.image))
+
+    @override_settings(IMAGE_VARIANT_FORMATS=('WEBP', 'JPEG'))
+    def test_variants(self):
+        """Варианты картинки разной ширины попадают в srcset"""
+
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 600), 'red').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            text='Большая картинка',
+            author=self.user,
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue()),
+        )
+
+        thumbnails.generate(post.image.name)
+        post.refresh_from_db()
+
+        formats = variants.available_formats()
+        self.assertEqual(
+            sorted({v['width'] for v in post.variants}),
+            [320, 640, 960]
+        )
+        self.assertEqual(len(post.variants), 3 * len(formats))
+        for variant in post.variants:
+            size = (variant['width'], round(variant['width'] * 339 / 960))
+            self.assertEqual((variant['width'], variant['height']), size)
+            path = os.path.join(MEDIA_ROOT, variant['name'])
+            with Image.open(path) as image:
+                self.assertEqual(image.size, size)
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, '320w')
+        self.assertContains(response, '960w')
+
+    def test_replaced_image_variants_deleted(self):
+        """Варианты заменённой картинки удаляются, если она больше
+        ни у кого не осталась"""
+
+        shared = Post.objects.create(
+            text='Та же картинка',
+            author=self.user,
+            image=self.post.image.name,
+        )
+        thumbnails.generate(self.post.image.name)
+        self.post.refresh_from_db()
+        shared.refresh_from_db()
+        old = [
+            os.path.join(MEDIA_ROOT, variant['name'])
+            for variant in self.post.variants
+        ]
+        self.client.force_login(self.user)
+
+        def edit(post):
+            with mock.patch(
+                'django.db.transaction.on_commit', lambda func: func(),
+            ):
+                self.client.post(
+                    reverse('posts:post_edit', args=(post.pk,)),
+                    {
+                        'text': post.text,
+                        'image': create_image(),
+                    },
+                )
+
+        edit(self.post)
+        self.assertTrue(old)
+        self.assertTrue(all(os.path.exists(path) for path in old))
+
+        edit(shared)
+        self.assertFalse(any(os.path.exists(path) for path in old))
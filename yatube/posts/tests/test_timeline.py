@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import timeline_posts
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков"""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.other, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post.pk])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        """Подписка подтягивает старые посты, отписка их убирает"""
+
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), [post.pk for post in reversed(posts)])
+
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении"""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+
+        post = Post.objects.create(text='Для всех', author=self.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, timeline_posts(self.other))
+        self.assertEqual(self.feed()[0], post.pk)
+
+    @override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_back_to_fan_out_keeps_posts(self):
+        """Посты, вышедшие в pull-режиме, остаются в лентах после
+        возврата автора к раскладке"""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Для всех', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        Follow.objects.get(user=self.other, author=self.author).delete()
+
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post,
+        ).exists())
+        self.assertEqual(self.feed(), [post.pk])
+
+    def test_follow_feed_query_count(self):
+        """Лента подписок не зависит от числа авторов"""
+
+        for i in range(5):
+            author = User.objects.create_user(username=f'author{i}')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(text=f'Пост {i}', author=author)
+
+        # пользователь и страница ленты; сессия читается из кеша
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.feed()), 5)
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                      UserStats)
+from ..search import search_posts
+from ..transfer import Importer
+from .create_image import create_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class TransferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
+
+        author = User.objects.create_user(username='author', first_name='Лев')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='testslug',
+        )
+        Follow.objects.create(user=reader, author=author)
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=author,
+            group=group,
+            image=create_image(),
+        )
+        Post.objects.create(text='Второй пост', author=reader)
+        Comment.objects.create(post=self.post, author=reader, text='Ок')
+
+    def export(self, name='dump.ndjson.gz'):
+        path = os.path.join(self.dir, name)
+        call_command('export_posts', path, stdout=StringIO())
+        return path
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        default_storage.delete(self.post.image.name)
+
+    def call_import(self, path, *args):
+        out = StringIO()
+        call_command('import_posts', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_round_trip(self):
+        """Импорт дампа восстанавливает данные и производные таблицы"""
+
+        path = self.export()
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(2), b'\x1f\x8b')
+        self.wipe()
+
+        self.assertIn('Загружено: записей:', self.call_import(path))
+
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.created, self.post.created)
+        self.assertEqual(post.group.slug, 'testslug')
+        self.assertEqual(post.author.first_name, 'Лев')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().text, 'Ок')
+        self.assertTrue(default_storage.exists(post.image.name))
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(post.group.posts_count, 1)
+        stats = UserStats.objects.get(user__username='author')
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user__username='reader',
+                post=post,
+            ).exists()
+        )
+        self.assertEqual(search_posts('картинка'), [post.pk])
+
+    def test_reimport_is_idempotent(self):
+        path = self.export('dump.ndjson')
+
+        self.call_import(path)
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_checkpoint_resume(self):
+        """После сбоя импорт продолжается с контрольной точки"""
+
+        path = self.export()
+        checkpoint = os.path.join(self.dir, 'checkpoint')
+        self.wipe()
+
+        with mock.patch.object(
+            Importer,
+            'import_comment',
+            side_effect=RuntimeError('сбой'),
+        ):
+            with self.assertRaises(RuntimeError):
+                self.call_import(path, '--checkpoint', checkpoint)
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(Comment.objects.exists())
+        with open(checkpoint) as file:
+            done = int(file.read())
+
+        with mock.patch.object(Importer, 'import_post') as import_post:
+            self.call_import(path, '--checkpoint', checkpoint)
+        import_post.assert_not_called()
+
+        self.assertEqual(Comment.objects.count(), 1)
+        with open(checkpoint) as file:
+            self.assertGreater(int(file.read()), done)
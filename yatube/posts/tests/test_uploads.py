@@ -0,0 +1,143 @@
+import shutil
+import struct
+import tempfile
+import zlib
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from ..forms import PostForm
+from ..uploads import strip_webp
+from ..models import Post, User
+from .create_image import create_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg_with_exif():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera maker'
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(
+        'photo.jpg',
+        buffer.getvalue(),
+        content_type='image/jpeg',
+    )
+
+
+def png_header(width, height):
+    """PNG, в заголовке которого заявлено width×height пикселей."""
+
+    buffer = BytesIO()
+    Image.new('L', (1, 1)).save(buffer, 'PNG')
+    data = bytearray(buffer.getvalue())
+    ihdr = struct.pack('>II', width, height) + bytes(data[24:29])
+    data[16:29] = ihdr
+    data[29:33] = struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return SimpleUploadedFile(
+        'bomb.png',
+        bytes(data),
+        content_type='image/png',
+    )
+
+
+def riff_chunk(kind, data):
+    padding = b'\0' * (len(data) % 2)
+    return struct.pack('<4sI', kind, len(data)) + data + padding
+
+
+def webp_with_metadata():
+    """WEBP с чанками EXIF и XMP и их флагами в VP8X."""
+
+    chunks = (
+        riff_chunk(b'VP8X', bytes((0x08 | 0x04 | 0x10,)) + bytes(9))
+        + riff_chunk(b'VP8L', b'\x2f' + bytes(4))
+        + riff_chunk(b'EXIF', b'GPS data')
+        + riff_chunk(b'XMP ', b'<x:xmpmeta/>')
+    )
+    return b'RIFF' + struct.pack('<I', len(chunks) + 4) + b'WEBP' + chunks
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class UploadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tester')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=16)
+    def test_oversized_upload_rejected(self):
+        """Файл сверх лимита не сохраняется и даёт ошибку формы"""
+
+        response = self.create(create_image())
+
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            response.context['form'].errors['image'][0],
+            'Файл больше 16\xa0байт.',
+        )
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=10_000)
+    def test_decompression_bomb_rejected(self):
+        """Разрешение проверяется по заголовку, без декодирования"""
+
+        form = PostForm(
+            data={'text': 'Пост'},
+            files={'image': png_header(1000, 1000)},
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()['image'][0].code,
+            'too_many_pixels',
+        )
+
+    def test_exif_stripped(self):
+        """EXIF вырезается из JPEG до сохранения"""
+
+        self.create(jpeg_with_exif())
+
+        post = Post.objects.get()
+        with post.image.open() as file, Image.open(file) as image:
+            self.assertEqual(image.size, (8, 8))
+            self.assertFalse(image.getexif())
+            image.load()
+
+    def test_webp_metadata_stripped(self):
+        """Из WEBP вырезаются чанки EXIF и XMP и их флаги"""
+
+        target = BytesIO()
+        strip_webp(BytesIO(webp_with_metadata()), target)
+
+        data = target.getvalue()
+        self.assertEqual(data[:4], b'RIFF')
+        self.assertEqual(struct.unpack('<I', data[4:8])[0], len(data) - 8)
+        self.assertEqual(
+            data[12:],
+            riff_chunk(b'VP8X', bytes((0x10,)) + bytes(9))
+            + riff_chunk(b'VP8L', b'\x2f' + bytes(4)),
+        )
+
+    def test_small_upload_saved(self):
+        self.create(create_image())
+
+        self.assertTrue(Post.objects.filter(image='posts/small.gif').exists())
@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from ..models import Post, Group, User
@@ -25,6 +26,7 @@ class PostsURLTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
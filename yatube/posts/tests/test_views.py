@@ -6,7 +6,8 @@ from django.test import override_settings
 import shutil
 from django.core.cache import cache
 
-from ..models import Post, Group, User
+from .. import feed_cache
+from ..models import Comment, Follow, Post, Group, User
 from .create_image import create_image
 
 PAGINATOR_ALL_POSTS_COUNT = 13
@@ -343,21 +344,53 @@ class PostsPagesTests(TestCase):
             reverse('posts:index')
         )
 
+        # Изменение в обход сигналов не сбрасывает кеш ленты
+        Post.objects.filter(pk=self.post2.pk).update(text='Скрытая правка')
+        response2 = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertEqual(response.content, response2.content)
+
+        # Новый пост сбрасывает кеш сразу, без ожидания таймаута
         Post.objects.create(
             text='Новый пост',
             author=self.user,
         )
-
-        response2 = self.authorized_client.get(
+        response3 = self.authorized_client.get(
             reverse('posts:index')
         )
-        self.assertEqual(response.content, response2.content)
+        self.assertNotEqual(response2.content, response3.content)
+        self.assertContains(response3, 'Новый пост')
 
         cache.clear()
-        response3 = self.authorized_client.get(
+        response4 = self.authorized_client.get(
             reverse('posts:index')
         )
-        self.assertNotEqual(response2.content, response3.content)
+        self.assertContains(response4, 'Скрытая правка')
+
+    def test_feed_cache_is_shared_between_users(self):
+        """Гость и пользователь получают один фрагмент ленты"""
+
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post2.pk).update(text='Скрытая правка')
+
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Скрытая правка')
+
+    def test_group_cache_invalidated_by_group_posts(self):
+        """Пост в группе сбрасывает кеш только своих лент"""
+
+        group_url = reverse('posts:group_list', args=(self.group.slug,))
+        other_url = reverse('posts:group_list', args=(self.group2.slug,))
+        self.client.get(group_url)
+        self.client.get(other_url)
+        Post.objects.filter(pk=self.post.pk).update(text='Скрытая правка')
+
+        Post.objects.create(text='Пост в группе', author=self.user,
+                            group=self.group)
+
+        self.assertContains(self.client.get(group_url), 'Пост в группе')
+        self.assertNotContains(self.client.get(other_url), 'Скрытая правка')
 
 
 class PaginatorViewsTest(TestCase):
@@ -407,3 +440,149 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     PAGINATOR_ALL_POSTS_COUNT - settings.POSTS_AMOUNT
                 )
+
+
+class ArticleCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tester')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='testslug'
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_article_shared_between_feeds(self):
+        """Карточка поста рендерится один раз для всех лент"""
+
+        self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Скрытая правка')
+
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,))
+        )
+        self.assertContains(response, 'Текст поста')
+
+    def test_article_refreshed_on_edit(self):
+        """Правка поста меняет ключ карточки"""
+
+        self.client.get(reverse('posts:index'))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        self.assertContains(response, 'Исправленный текст')
+        self.assertNotContains(response, 'Текст поста')
+
+    def test_article_refreshed_on_rename(self):
+        """Новое имя автора и адрес группы сразу видны в лентах"""
+
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=(self.user.username,)))
+
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.last_name = 'Толстой'
+        user.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.user.username,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Лев Толстой')
+                self.assertContains(
+                    response, reverse('posts:group_list', args=('renamed',)),
+                )
+
+    def test_login_does_not_invalidate_feeds(self):
+        """Сохранение last_login без имени не сбрасывает ленты"""
+
+        generation = feed_cache.generation(feed_cache.INDEX)
+        user = User.objects.only('pk', 'last_login').get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+        self.assertEqual(
+            feed_cache.generation(feed_cache.INDEX), generation,
+        )
+
+
+@override_settings(
+    QUERY_TRACE_ENABLED=True,
+    QUERY_TRACE_STRICT=True,
+    QUERY_TRACE_SLOW_MS=10_000,
+)
+class QueryTraceViewsTest(TestCase):
+    """Страницы не повторяют запросы для каждого поста или комментария"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(3)
+        ]
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(5):
+            cls.post = Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.users[number % 3],
+                group=cls.group,
+            )
+            for user in cls.users:
+                Comment.objects.create(post=cls.post, author=user, text='Ок')
+        for author in cls.users[1:]:
+            Follow.objects.create(user=cls.users[0], author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.users[1].username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:search') + '?q=пост',
+            reverse('posts:follow_index'),
+            reverse('posts:post_edit', args=(self.post.pk,)),
+        )
+        for user in (None, self.post.author):
+            if user is not None:
+                self.client.force_login(user)
+            for url in urls:
+                with self.subTest(url=url, user=user):
+                    cache.clear()
+                    self.client.get(url)
+
+    def test_writes(self):
+        self.client.force_login(self.post.author)
+
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Новый'},
+        )
+        self.client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Правка', 'group': self.group.pk},
+        )
+        self.client.post(reverse('posts:post_create'), {'text': 'Ещё'})
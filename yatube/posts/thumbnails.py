@@ -0,0 +1,169 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Миниатюры и адаптивные варианты (posts/variants.py) создаются
+пулом потоков сразу после сохранения поста,
+а шаблоны только читают готовую миниатюру из KV-хранилища sorl и
+до её появления показывают заглушку - ресайз не блокирует ответ.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.templatetags.static import static
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache, variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+SCHEDULED_KEY = 'thumbnails:scheduled:{}'
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+class CachedThumbnailBackend(ThumbnailBackend):
+    """Ищет готовую миниатюру, не создавая её.
+
+    Опции и имя файла готовятся как в ThumbnailBackend.get_thumbnail
+    sorl-thumbnail 12.7 (версия закреплена в requirements.txt), у sorl
+    нет публичного поиска без создания. test_cached_name_matches_sorl
+    сверяет имена с самим sorl и упадёт при несовместимом обновлении.
+    """
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+
+        # Те же опции по умолчанию, что и в ThumbnailBackend.get_thumbnail,
+        # иначе имя файла миниатюры не совпадёт.
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = CachedThumbnailBackend()
+
+
+def placeholder_url():
+    return static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+def thumbnail_url(image):
+    """URL готовой миниатюры или None.
+
+    Если миниатюры нет, её создание ставится в очередь заново:
+    прошлая попытка могла не удаться или потеряться с перезапуском.
+    """
+
+    if not image:
+        return None
+    thumbnail = backend.get_cached_thumbnail(image, GEOMETRY, **OPTIONS)
+    if thumbnail is None:
+        schedule(image)
+        return None
+    return thumbnail.url
+
+
+def generate(name):
+    """Создаёт миниатюру картинки по имени файла в хранилище."""
+
+    try:
+        get_thumbnail(name, GEOMETRY, **OPTIONS)
+        variants.generate(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return False
+
+    refresh_posts(name)
+    return True
+
+
+def refresh_posts(name):
+    """Сбрасывает кеш карточек, отрендеренных с заглушкой.
+
+    Меняется версия картинки, а не updated: готовая миниатюра -
+    не правка поста.
+    """
+
+    posts = list(
+        Post.objects.filter(image=name).only('pk', 'author_id', 'group_id')
+    )
+    if not posts:
+        return
+
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        image_version=F('image_version') + 1,
+    )
+    for post in posts:
+        feed_cache.bump(*feed_cache.post_scopes(post))
+
+
+def _generate_in_worker(name):
+    try:
+        generate(name)
+    finally:
+        close_old_connections()
+
+
+def in_background():
+    """Можно ли создавать миниатюры в пуле потоков.
+
+    SQLite в памяти (тестовая база) блокирует таблицы целиком и
+    не ждёт освобождения: запросы фонового потока ломают запросы
+    и очистку базы основного потока, поэтому с ней миниатюры
+    создаются сразу после коммита в том же потоке.
+    """
+
+    if not settings.THUMBNAIL_ASYNC:
+        return False
+    return not (
+        connection.vendor == 'sqlite' and connection.is_in_memory_db()
+    )
+
+
+def schedule(image):
+    """Ставит создание миниатюры в очередь после коммита транзакции,
+    не чаще раза в THUMBNAIL_RETRY_INTERVAL для одной картинки."""
+
+    if not image:
+        return
+
+    name = image.name
+    if not cache.add(
+        SCHEDULED_KEY.format(name), True, settings.THUMBNAIL_RETRY_INTERVAL,
+    ):
+        return
+    if in_background():
+        transaction.on_commit(
+            lambda: _get_executor().submit(_generate_in_worker, name)
+        )
+    else:
+        transaction.on_commit(lambda: generate(name))
@@ -0,0 +1,149 @@
+"""Лента подписок с раскладкой при записи (fan-out-on-write).
+
+Публикация поста раскладывается в TimelineEntry каждому подписчику,
+поэтому чтение ленты - один диапазон по индексу (user, created).
+Посты авторов с огромным числом подписчиков не раскладываются:
+их подмешиваем при чтении (fan-out-on-read).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+PULL_AUTHORS_CACHE_KEY = 'timeline:pull_authors'
+
+
+def is_pull_author(author_id):
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count',
+        flat=True,
+    ).first()
+    return (followers or 0) > settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def pull_authors():
+    """Авторы, чьи посты не раскладываются по лентам."""
+
+    authors = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if authors is None:
+        authors = set(
+            UserStats.objects.filter(
+                followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(PULL_AUTHORS_CACHE_KEY, authors, None)
+
+    return authors
+
+
+def reset_pull_authors():
+    cache.delete(PULL_AUTHORS_CACHE_KEY)
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def followers(author_id):
+    return Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True,
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+
+    if post.author_id in pull_authors():
+        return
+
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post=post, created=post.created)
+        for user_id in followers(post.author_id).iterator()
+    )
+
+
+def _recent_posts(author_id):
+    return list(Post.objects.filter(author_id=author_id).order_by(
+        '-created'
+    ).values_list('pk', 'created')[:settings.TIMELINE_BACKFILL_POSTS])
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+
+    if author_id in pull_authors():
+        return
+
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=pk, created=created)
+        for pk, created in _recent_posts(author_id)
+    )
+
+
+def backfill_followers(author_id):
+    """Раскладывает последние посты автора всем подписчикам: пока
+    автор был pull-автором, его посты в ленты не попадали."""
+
+    posts = _recent_posts(author_id)
+    if not posts:
+        return
+
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post_id=pk, created=created)
+        for user_id in followers(author_id).iterator()
+        for pk, created in posts
+    )
+
+
+def purge(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def follow_changed(author_id):
+    """Сбрасывает список pull-авторов, если автор пересёк порог;
+    вернувшемуся к раскладке автору заполняет ленты подписчиков."""
+
+    was_pull = author_id in pull_authors()
+    if is_pull_author(author_id) == was_pull:
+        return
+    reset_pull_authors()
+    if was_pull:
+        backfill_followers(author_id)
+
+
+def timeline_posts(user):
+    """Посты ленты подписок, отсортированные для CursorPaginator
+    по ключу feed_created."""
+
+    posts = Post.objects.select_related('author__stats', 'group')
+
+    pulled = pull_authors()
+    if pulled:
+        pulled = set(
+            Follow.objects.filter(
+                user=user,
+                author_id__in=pulled,
+            ).values_list('author_id', flat=True)
+        )
+
+    if not pulled:
+        return posts.filter(timeline_entries__user=user).annotate(
+            feed_created=F('timeline_entries__created')
+        )
+
+    own = TimelineEntry.objects.filter(user=user).values('post_id')
+
+    return posts.filter(
+        Q(pk__in=own) | Q(author_id__in=pulled)
+    ).annotate(feed_created=F('created'))
@@ -0,0 +1,452 @@
+"""Перенос постов между инсталляциями в формате NDJSON.
+
+Каждая строка - одна запись {"model": ..., ...}. Записи ссылаются
+друг на друга естественными ключами (username, slug группы, автор
+и время поста), поэтому первичные ключи в целевой базе могут быть
+любыми, а повторный импорт того же файла ничего не дублирует.
+Картинки идут записями "file" кусками по FILE_CHUNK_SIZE.
+
+Экспорт читает базу итераторами, импорт пишет пачками через
+bulk_create. Сигналы при этом не срабатывают, поэтому импорт сам
+раскладывает посты по лентам, обновляет поисковый индекс и поколения
+лент, а в конце пересчитывает счётчики.
+"""
+
+import base64
+import contextlib
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed_cache, search, timeline
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+
+FORMAT_VERSION = 1
+FILE_CHUNK_SIZE = 512 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_stream(path, mode, compress=False):
+    """Открывает файл дампа; gzip при чтении определяется по сигнатуре."""
+
+    if mode == 'r':
+        with open(path, 'rb') as file:
+            compress = file.read(2) == GZIP_MAGIC
+    opener = gzip.open if compress else open
+    return opener(path, f'{mode}t', encoding='utf-8')
+
+
+def _time(value):
+    return value.isoformat() if value else None
+
+
+@contextlib.contextmanager
+def preserve_timestamps(*models):
+    """Отключает auto_now/auto_now_add, чтобы bulk_create сохранил
+    даты из дампа."""
+
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def export_records(chunk_size, files=True):
+    """Записи дампа по порядку зависимостей."""
+
+    yield {
+        'model': 'header',
+        'version': FORMAT_VERSION,
+        'exported': _time(timezone.now()),
+    }
+
+    for slug, title, description in Group.objects.order_by('pk').values_list(
+        'slug', 'title', 'description',
+    ).iterator(chunk_size=chunk_size):
+        yield {
+            'model': 'group',
+            'slug': slug,
+            'title': title,
+            'description': description,
+        }
+
+    users = User.objects.order_by('pk').values_list(
+        'username', 'first_name', 'last_name', 'email', 'date_joined',
+    )
+    for username, first_name, last_name, email, joined in users.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'model': 'user',
+            'username': username,
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': email,
+            'date_joined': _time(joined),
+        }
+
+    posts = Post.objects.order_by('pk').values_list(
+        'author__username', 'created', 'updated', 'group__slug', 'text',
+        'image',
+    )
+    for author, created, updated, group, text, image in posts.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'model': 'post',
+            'author': author,
+            'created': _time(created),
+            'updated': _time(updated),
+            'group': group,
+            'text': text,
+            'image': image,
+        }
+
+    if files:
+        yield from export_files(chunk_size)
+
+    comments = Comment.objects.order_by('pk').values_list(
+        'post__author__username', 'post__created', 'author__username',
+        'created', 'text',
+    )
+    for post_author, post_created, author, created, text in comments.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'model': 'comment',
+            'post': [post_author, _time(post_created)],
+            'author': author,
+            'created': _time(created),
+            'text': text,
+        }
+
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username',
+    )
+    for user, author in follows.iterator(chunk_size=chunk_size):
+        yield {'model': 'follow', 'user': user, 'author': author}
+
+
+def export_files(chunk_size):
+    names = Post.objects.exclude(image='').order_by().values_list(
+        'image', flat=True,
+    ).distinct()
+    for name in names.iterator(chunk_size=chunk_size):
+        if not default_storage.exists(name):
+            continue
+        with default_storage.open(name) as file:
+            chunk = file.read(FILE_CHUNK_SIZE)
+            while True:
+                following = file.read(FILE_CHUNK_SIZE)
+                yield {
+                    'model': 'file',
+                    'name': name,
+                    'data': base64.b64encode(chunk).decode(),
+                    'last': not following,
+                }
+                if not following:
+                    break
+                chunk = following
+
+
+class Progress:
+    """Счётчик записей со скоростью, не чаще раза в interval секунд."""
+
+    def __init__(self, write, interval=5):
+        self.write = write
+        self.interval = interval
+        self.started = self.reported = time.monotonic()
+        self.total = 0
+
+    def add(self, count=1):
+        self.total += count
+        now = time.monotonic()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            self.write(self.line())
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (
+            f'записей: {self.total}, {self.total / elapsed:.0f} в секунду, '
+            f'время: {elapsed:.1f} с'
+        )
+
+
+class Importer:
+    """Пачечный импорт дампа с контрольной точкой.
+
+    После каждой записанной пачки номер последней строки сохраняется
+    в файл checkpoint; повторный запуск пропускает эти строки.
+    """
+
+    def __init__(self, batch_size, progress, checkpoint=None, files=True):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.checkpoint = checkpoint
+        self.files = files
+        self.upload = None
+
+    def run(self, lines):
+        done = self.load_checkpoint()
+        kind, batch = None, []
+
+        for number, line in enumerate(lines, 1):
+            if number <= done or not line.strip():
+                continue
+            record = json.loads(line)
+
+            if batch and (
+                record['model'] != kind or len(batch) >= self.batch_size
+            ):
+                self.flush(kind, batch, number - 1)
+                batch = []
+
+            if record['model'] == 'file':
+                self.import_file_chunk(record, number)
+                continue
+
+            kind = record['model']
+            batch.append(record)
+
+        if batch:
+            self.flush(kind, batch, number)
+
+        self.finish()
+
+    def load_checkpoint(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint) as file:
+            return int(file.read().strip() or 0)
+
+    def save_checkpoint(self, number):
+        if not self.checkpoint:
+            return
+        partial = f'{self.checkpoint}.tmp'
+        with open(partial, 'w') as file:
+            file.write(str(number))
+        os.replace(partial, self.checkpoint)
+
+    def flush(self, kind, batch, number):
+        handler = getattr(self, f'import_{kind}', None)
+        if handler is None:
+            raise ValueError(f'Неизвестный тип записи: {kind}')
+
+        with transaction.atomic():
+            handler(batch)
+        self.save_checkpoint(number)
+        self.progress.add(len(batch))
+
+    def finish(self):
+        # Счётчики меняли только bulk_create - пересчитываем разом.
+        counters.recount()
+        timeline.reset_pull_authors()
+        feed_cache.bump(feed_cache.INDEX)
+
+    def import_header(self, records):
+        for record in records:
+            if record['version'] != FORMAT_VERSION:
+                raise ValueError(
+                    f'Неподдерживаемая версия дампа: {record["version"]}'
+                )
+
+    def import_group(self, records):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    slug=record['slug'],
+                    title=record['title'],
+                    description=record['description'],
+                )
+                for record in records
+            ],
+            ignore_conflicts=True,
+        )
+
+    def import_user(self, records):
+        # Пароли не переносятся: пользователи восстановят их по почте.
+        unusable = make_password(None)
+        User.objects.bulk_create(
+            [
+                User(
+                    username=record['username'],
+                    first_name=record['first_name'],
+                    last_name=record['last_name'],
+                    email=record['email'],
+                    date_joined=parse_datetime(record['date_joined']),
+                    password=unusable,
+                )
+                for record in records
+            ],
+            ignore_conflicts=True,
+        )
+
+    def user_ids(self, usernames):
+        return dict(
+            User.objects.filter(username__in=set(usernames)).values_list(
+                'username', 'pk',
+            )
+        )
+
+    def post_ids(self, keys):
+        """pk постов по ключам (username автора, время создания)."""
+
+        return {
+            (author, created): pk
+            for author, created, pk in Post.objects.filter(
+                author__username__in={author for author, _ in keys},
+                created__in={created for _, created in keys},
+            ).values_list('author__username', 'created', 'pk')
+        }
+
+    def post_key(self, author, created):
+        return author, parse_datetime(created)
+
+    def import_post(self, records):
+        users = self.user_ids(record['author'] for record in records)
+        groups = dict(
+            Group.objects.filter(
+                slug__in={record['group'] for record in records}
+            ).values_list('slug', 'pk')
+        )
+        keys = [
+            self.post_key(record['author'], record['created'])
+            for record in records
+        ]
+        existing = self.post_ids(keys)
+
+        posts = [
+            Post(
+                author_id=users[record['author']],
+                created=key[1],
+                updated=parse_datetime(record['updated']),
+                group_id=groups.get(record['group']),
+                text=record['text'],
+                image=record['image'] or '',
+            )
+            for key, record in zip(keys, records)
+            if key not in existing
+        ]
+        with preserve_timestamps(Post):
+            Post.objects.bulk_create(posts, batch_size=self.batch_size)
+
+        imported = list(Post.objects.filter(
+            pk__in=set(self.post_ids(keys).values()) - set(existing.values())
+        ).select_related('author', 'group'))
+        index = search.get_index()
+        if index is not None:
+            index.index(imported)
+        self.fan_out(imported)
+
+    def fan_out(self, posts):
+        """Раскладывает импортированные посты по лентам подписчиков."""
+
+        pulled = timeline.pull_authors()
+        by_author = {}
+        for post in posts:
+            if post.author_id not in pulled:
+                by_author.setdefault(post.author_id, []).append(post)
+
+        followers = Follow.objects.filter(
+            author_id__in=by_author,
+        ).values_list('user_id', 'author_id')
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=user_id, post=post, created=post.created)
+                for user_id, author_id in followers.iterator()
+                for post in by_author[author_id]
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+        scopes = set()
+        for post in posts:
+            scopes |= feed_cache.post_scopes(post)
+        feed_cache.bump(*scopes)
+
+    def import_comment(self, records):
+        keys = [self.post_key(*record['post']) for record in records]
+        posts = self.post_ids(keys)
+        users = self.user_ids(record['author'] for record in records)
+
+        comments = [
+            Comment(
+                post_id=posts[key],
+                author_id=users[record['author']],
+                created=parse_datetime(record['created']),
+                text=record['text'],
+            )
+            for key, record in zip(keys, records)
+        ]
+        existing = set(
+            Comment.objects.filter(
+                post_id__in={comment.post_id for comment in comments},
+                created__in={comment.created for comment in comments},
+            ).values_list('post_id', 'author_id', 'created')
+        )
+        with preserve_timestamps(Comment):
+            Comment.objects.bulk_create(
+                [
+                    comment for comment in comments
+                    if (comment.post_id, comment.author_id, comment.created)
+                    not in existing
+                ],
+                batch_size=self.batch_size,
+            )
+
+    def import_follow(self, records):
+        users = self.user_ids(
+            name for record in records
+            for name in (record['user'], record['author'])
+        )
+        pairs = [
+            (users[record['user']], users[record['author']])
+            for record in records
+        ]
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in pairs
+            ],
+            ignore_conflicts=True,
+        )
+        for user_id, author_id in pairs:
+            timeline.backfill(user_id, author_id)
+
+    def import_file_chunk(self, record, number):
+        if not self.files:
+            return
+
+        if self.upload is None:
+            self.upload = tempfile.TemporaryFile()
+        self.upload.write(base64.b64decode(record['data']))
+
+        if record['last']:
+            upload, self.upload = self.upload, None
+            with upload:
+                if not default_storage.exists(record['name']):
+                    upload.seek(0)
+                    default_storage.save(record['name'], File(upload))
+            self.save_checkpoint(number)
+            self.progress.add()
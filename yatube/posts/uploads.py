@@ -0,0 +1,272 @@
+"""Потоковая загрузка картинок постов.
+
+Обработчик пишет загрузку сразу на диск, перестаёт сохранять её,
+как только превышен IMAGE_UPLOAD_MAX_SIZE, и вырезает EXIF и XMP
+из JPEG, PNG и WEBP, копируя файл блоками. ImageField формы
+открывает файл с диска и читает только заголовок, а PostForm по нему
+отсекает «бомбы» по числу пикселей. Так одновременные загрузки
+не раздувают память воркера.
+"""
+
+import struct
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import (TemporaryUploadedFile,
+                                            UploadedFile)
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+CHUNK_SIZE = 64 * 1024
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_SOS = 0xDA
+# Маркеры без длины: TEM, RST0-RST7, SOI, EOI.
+JPEG_STANDALONE = {0x01, *range(0xD0, 0xDA)}
+# APP1 - EXIF и XMP, APP13 - IPTC. ICC-профиль (APP2) оставляем.
+JPEG_METADATA = {0xE1, 0xED}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA = {b'eXIf', b'tEXt', b'zTXt', b'iTXt'}
+
+RIFF = b'RIFF'
+WEBP = b'WEBP'
+WEBP_METADATA = {b'EXIF', b'XMP '}
+# Флаги EXIF и XMP в первом байте чанка VP8X.
+WEBP_METADATA_FLAGS = 0x08 | 0x04
+
+
+def _copy(source, target, size=None):
+    """Копирует size байт (или всё до конца) блоками."""
+
+    while size is None or size > 0:
+        chunk = source.read(
+            CHUNK_SIZE if size is None else min(CHUNK_SIZE, size)
+        )
+        if not chunk:
+            break
+        target.write(chunk)
+        if size is not None:
+            size -= len(chunk)
+
+
+def _jpeg_marker(source):
+    """Читает следующий маркер JPEG, None - конец файла."""
+
+    byte = source.read(1)
+    if not byte:
+        return None
+    if byte != b'\xff':
+        raise ValueError('broken JPEG marker')
+
+    code = source.read(1)
+    while code == b'\xff':
+        code = source.read(1)
+    return ord(code) if code else None
+
+
+def strip_jpeg(source, target):
+    """Копирует JPEG без сегментов EXIF/XMP/IPTC."""
+
+    if source.read(2) != JPEG_SOI:
+        raise ValueError('not a JPEG')
+    target.write(JPEG_SOI)
+
+    while True:
+        marker = _jpeg_marker(source)
+        if marker is None:
+            return
+        if marker in JPEG_STANDALONE:
+            target.write(bytes((0xFF, marker)))
+            continue
+
+        header = source.read(2)
+        if len(header) != 2:
+            raise ValueError('truncated JPEG segment')
+        length, = struct.unpack('>H', header)
+
+        if marker in JPEG_METADATA:
+            source.seek(length - 2, 1)
+            continue
+
+        target.write(bytes((0xFF, marker)) + header)
+        if marker == JPEG_SOS:
+            # Дальше сжатые данные, метаданных в них уже не бывает.
+            _copy(source, target)
+            return
+        _copy(source, target, length - 2)
+
+
+def strip_png(source, target):
+    """Копирует PNG без текстовых чанков и eXIf."""
+
+    if source.read(8) != PNG_SIGNATURE:
+        raise ValueError('not a PNG')
+    target.write(PNG_SIGNATURE)
+
+    while True:
+        header = source.read(8)
+        if not header:
+            return
+        if len(header) != 8:
+            raise ValueError('truncated PNG chunk')
+        length, kind = struct.unpack('>I4s', header)
+
+        if kind in PNG_METADATA:
+            source.seek(length + 4, 1)
+            continue
+
+        target.write(header)
+        _copy(source, target, length + 4)
+        if kind == b'IEND':
+            return
+
+
+def strip_webp(source, target):
+    """Копирует WEBP без чанков EXIF и XMP.
+
+    Флаги этих чанков в VP8X сбрасываются, размер RIFF
+    переписывается в конце.
+    """
+
+    header = source.read(12)
+    if len(header) != 12 or header[:4] != RIFF or header[8:] != WEBP:
+        raise ValueError('not a WEBP')
+    target.write(header)
+
+    while True:
+        chunk = source.read(8)
+        if not chunk:
+            break
+        if len(chunk) != 8:
+            raise ValueError('truncated WEBP chunk')
+        kind, length = struct.unpack('<4sI', chunk)
+        # Данные чанка выравниваются до чётной длины.
+        padded = length + length % 2
+
+        if kind in WEBP_METADATA:
+            source.seek(padded, 1)
+            continue
+
+        target.write(chunk)
+        if kind == b'VP8X':
+            flags = source.read(1)
+            if not flags:
+                raise ValueError('truncated WEBP chunk')
+            target.write(bytes((flags[0] & ~WEBP_METADATA_FLAGS,)))
+            padded -= 1
+        _copy(source, target, padded)
+
+    size = target.tell()
+    target.seek(4)
+    target.write(struct.pack('<I', size - 8))
+    target.seek(size)
+
+
+# Сигнатура файла (первые два байта) -> функция очистки.
+STRIPPERS = {
+    JPEG_SOI: strip_jpeg,
+    PNG_SIGNATURE[:2]: strip_png,
+    RIFF[:2]: strip_webp,
+}
+
+
+class DiscardedUpload(UploadedFile):
+    """Отброшенная загрузка: содержимого нет, известна только причина."""
+
+    def __init__(self, name, content_type, size, charset, reason):
+        super().__init__(BytesIO(), name, content_type, size, charset)
+        self.reason = reason
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузки во временный файл, не храня больше лимита,
+    и вырезает из них метаданные."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            # Остаток тела всё равно читается парсером, но не сохраняется.
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def discard(self, reason):
+        self.file.close()
+        return DiscardedUpload(
+            self.file_name,
+            self.content_type,
+            self.received,
+            self.charset,
+            reason,
+        )
+
+    def file_complete(self, file_size):
+        if self.received > settings.IMAGE_UPLOAD_MAX_SIZE:
+            return self.discard('too_large')
+
+        upload = super().file_complete(file_size)
+        upload.seek(0)
+        stripper = STRIPPERS.get(upload.read(2))
+        upload.seek(0)
+        if stripper is None:
+            return upload
+
+        stripped = TemporaryUploadedFile(
+            self.file_name,
+            self.content_type,
+            0,
+            self.charset,
+            self.content_type_extra,
+        )
+        try:
+            stripper(upload, stripped)
+        except (ValueError, struct.error):
+            # Разобрать не удалось - метаданные могли остаться.
+            stripped.close()
+            return self.discard('invalid_image')
+
+        upload.close()
+        stripped.size = stripped.tell()
+        stripped.seek(0)
+        return stripped
+
+
+def validate_upload(upload):
+    """Проверяет, не отбросил ли загрузку BoundedUploadHandler."""
+
+    reason = getattr(upload, 'reason', None)
+    if reason == 'too_large':
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='too_large',
+            params={'limit': filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)},
+        )
+    if reason is not None:
+        raise ValidationError(
+            'Файл повреждён или не является картинкой.',
+            code=reason,
+        )
+
+
+def validate_image(image):
+    """Проверяет открытую (но не декодированную) картинку по заголовку."""
+
+    if image.format not in settings.IMAGE_UPLOAD_FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image.format},
+        )
+
+    width, height = image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение: %(width)s×%(height)s.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
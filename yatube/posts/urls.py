@@ -5,6 +5,7 @@ from . import views
 app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
+    path('search/', views.search, name='search'),
 
     path(
         'group/<slug:slug>/',
@@ -0,0 +1,155 @@
+"""Адаптивные варианты картинок постов.
+
+Из картинки вырезается та же центральная область, что и у миниатюры
+ленты, и сохраняется в нескольких ширинах и форматах. Шаблон отдаёт
+их через <picture>/srcset, и браузер выбирает ближайший по размеру
+вариант в самом компактном поддерживаемом формате.
+"""
+
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from .models import Post
+
+# Порядок важен: браузер берёт первый <source>, который понимает.
+FORMATS = {
+    'AVIF': ('avif', 'image/avif', {'quality': 50}),
+    'WEBP': ('webp', 'image/webp', {'quality': 75, 'method': 4}),
+    'JPEG': ('jpg', 'image/jpeg', {'quality': 80, 'progressive': True}),
+}
+FALLBACK_FORMAT = 'JPEG'
+
+
+def available_formats():
+    """Форматы из IMAGE_VARIANT_FORMATS, которые умеет сохранять Pillow."""
+
+    Image.init()
+    formats = [
+        name for name in settings.IMAGE_VARIANT_FORMATS
+        if name in FORMATS and name in Image.SAVE
+    ]
+    if FALLBACK_FORMAT not in formats:
+        formats.append(FALLBACK_FORMAT)
+    return formats
+
+
+def crop_to_ratio(image, ratio):
+    width, height = image.size
+    if width / height > ratio:
+        new_width = round(height * ratio)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+
+    new_height = round(width / ratio)
+    top = (height - new_height) // 2
+    return image.crop((0, top, width, top + new_height))
+
+
+def variant_widths(source_width):
+    """Ширины без увеличения; узкая картинка даёт один вариант."""
+
+    widths = [
+        width for width in settings.IMAGE_VARIANT_WIDTHS
+        if width <= source_width
+    ]
+    return widths or [source_width]
+
+
+def build(name):
+    """Создаёт варианты картинки, возвращает их описание."""
+
+    ratio_width, ratio_height = settings.IMAGE_VARIANT_RATIO
+    base, _ = os.path.splitext(os.path.basename(name))
+
+    with default_storage.open(name) as file:
+        with Image.open(file) as source:
+            source = crop_to_ratio(
+                source.convert('RGB'),
+                ratio_width / ratio_height,
+            )
+
+    variants = []
+    for width in variant_widths(source.width):
+        height = round(width * ratio_height / ratio_width)
+        resized = source.resize((width, height), Image.LANCZOS)
+
+        for format_name in available_formats():
+            extension, mime, options = FORMATS[format_name]
+            buffer = BytesIO()
+            resized.save(buffer, format_name, **options)
+            stored = default_storage.save(
+                f'posts/variants/{base}_{width}.{extension}',
+                ContentFile(buffer.getvalue()),
+            )
+            variants.append({
+                'width': width,
+                'height': height,
+                'format': format_name,
+                'type': mime,
+                'name': stored,
+            })
+
+    return variants
+
+
+def generate(name):
+    """Пересобирает варианты для всех постов с этой картинкой."""
+
+    posts = Post.objects.filter(image=name)
+    old = {
+        variant['name']
+        for post in posts.only('image_variants')
+        for variant in post.variants
+    }
+
+    variants = build(name)
+    posts.update(image_variants=json.dumps(variants))
+    for stale in old:
+        default_storage.delete(stale)
+
+    return variants
+
+
+def discard(image, variants):
+    """Удаляет файлы вариантов заменённой картинки после коммита,
+    если её не показывает больше ни один пост."""
+
+    names = [variant['name'] for variant in variants]
+    if not names:
+        return
+
+    def delete():
+        if Post.objects.filter(image=image).exists():
+            return
+        for name in names:
+            default_storage.delete(name)
+
+    transaction.on_commit(delete)
+
+
+def sources(post):
+    """Наборы srcset по форматам для шаблона, резервный формат последним."""
+
+    by_format = {}
+    for variant in post.variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+
+    result = []
+    for format_name in sorted(by_format, key=list(FORMATS).index):
+        variants = sorted(by_format[format_name], key=lambda v: v['width'])
+        result.append({
+            'type': variants[0]['type'],
+            'fallback': format_name == FALLBACK_FORMAT,
+            'srcset': ', '.join(
+                f'{default_storage.url(v["name"])} {v["width"]}w'
+                for v in variants
+            ),
+        })
+    return result
@@ -1,18 +1,51 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
+from django.utils.http import urlencode
 
+from . import comment_queue, feed_cache, thumbnails, variants
+from .conditional import (not_modified, page_validators, patch_page_cache,
+                          set_validators)
 from .models import Follow, Group, Post, User
 from .forms import PostForm, CommentForm
-from .paginator_custom import paginator_custom
+from .paginator_custom import CursorPaginator, paginator_custom
+from .search import search_posts
+from .timeline import timeline_posts
+
+
+# Запросы представлений; их же проверяет команда audit_indexes.
+def feed_posts():
+    return Post.objects.select_related('author__stats', 'group')
+
+
+def group_feed(group):
+    return feed_posts().filter(group=group)
+
+
+def profile_feed(author):
+    return author.posts.select_related('group')
+
+
+def following_query(author, user):
+    return Follow.objects.filter(author=author, user=user)
+
+
+def comments_paginator(post):
+    return CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_AMOUNT,
+        descending=False,
+    )
 
 
 def index(request):
     template = 'posts/index.html'
 
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = paginator_custom(request, post_list)
+    post_list = feed_posts()
+    page_obj = paginator_custom(request, post_list, cursor=True)
 
     context = {
         'page_obj': page_obj,
@@ -21,32 +54,77 @@ def index(request):
     return render(request, template, context)
 
 
+def search(request):
+    template = 'posts/search.html'
+
+    query = request.GET.get('q', '').strip()
+    found = search_posts(query, settings.SEARCH_MAX_RESULTS) if query else []
+
+    page_obj = Paginator(found, settings.POSTS_AMOUNT).get_page(
+        request.GET.get('page')
+    )
+    posts = feed_posts().in_bulk(
+        page_obj.object_list
+    )
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'paginator_query': urlencode({'q': query}) + '&',
+    }
+
+    return render(request, template, context)
+
+
 def group_posts(request, slug):
     template = 'posts/group_list.html'
 
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.select_related('author').filter(group=group)
-    page_obj = paginator_custom(request, post_list)
+    validators = page_validators(
+        request,
+        feed_cache.scope('group', group.pk),
+        group.posts.all(),
+    )
+    response = not_modified(request, *validators)
+    if response is not None:
+        return patch_page_cache(request, response)
+
+    post_list = group_feed(group)
+    page_obj = paginator_custom(request, post_list, cursor=True)
 
     context = {
         'group': group,
         'page_obj': page_obj,
     }
 
-    return render(request, template, context)
+    response = render(request, template, context)
+    set_validators(response, *validators)
+    return patch_page_cache(request, response)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    page_obj = paginator_custom(request, post_list)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
+    validators = page_validators(
+        request,
+        feed_cache.scope('author', author.pk),
+        author.posts.all(),
+    )
+    response = not_modified(request, *validators)
+    if response is not None:
+        return patch_page_cache(request, response)
+
+    post_list = profile_feed(author)
+    page_obj = paginator_custom(request, post_list, cursor=True)
 
     following = (
         request.user.is_authenticated
-        and Follow.objects.filter(
-            author=author,
-            user=request.user
-        ).exists
+        and following_query(author, request.user).exists
     )
 
     context = {
@@ -55,21 +133,40 @@ def profile(request, username):
         'following': following
     }
 
-    return render(request, 'posts/profile.html', context)
+    response = render(request, 'posts/profile.html', context)
+    set_validators(response, *validators)
+    return patch_page_cache(request, response)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(feed_posts(), pk=post_id)
+    # Комментарии и правки поста сдвигают поколение ленты автора,
+    # а свои комментарии из очереди автор видит до их записи.
+    pending = comment_queue.pending_comments(request.user, post.pk)
+    validators = page_validators(
+        request,
+        feed_cache.scope('author', post.author_id),
+        post.author.posts.all(),
+        post.pk,
+        len(pending),
+    )
+    response = not_modified(request, *validators)
+    if response is not None:
+        return patch_page_cache(request, response)
+
+    comments = comments_paginator(post).get_page(request.GET.get('comments'))
     form = CommentForm()
 
     context = {
         'post': post,
         'comments': comments,
+        'pending_comments': pending,
         'form': form,
     }
 
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    set_validators(response, *validators)
+    return patch_page_cache(request, response)
 
 
 @login_required
@@ -81,9 +178,12 @@ def post_create(request):
 
     if form.is_valid():
         post = form.save(commit=False)
-        post.author = request.user
+        # Пользователь из кеша (users/backends.py) загружен не полностью,
+        # автора для индекса поиска загрузит сигнал.
+        post.author_id = request.user.pk
         post.save()
-        return redirect('posts:profile', post.author)
+        thumbnails.schedule(post.image)
+        return redirect('posts:profile', request.user.username)
 
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -91,17 +191,25 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
+    # Форма заменит картинку в post ещё при проверке.
+    old_image, old_variants = post.image.name, post.variants
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post,
     )
 
-    if not request.user == post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id)
 
     if form.is_valid():
-        post = form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            post.image_variants = ''
+        post.save()
+        if 'image' in form.changed_data:
+            variants.discard(old_image, old_variants)
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id)
 
     context = {
@@ -114,14 +222,19 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = Post.objects.get(pk=post_id)
+    # Полная строка поста не нужна: только его ленты для сброса кеша.
+    post = get_object_or_404(
+        Post.objects.only('author_id', 'group_id'),
+        pk=post_id,
+    )
 
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment_queue.submit(
+            post,
+            request.user.pk,
+            form.cleaned_data['text'],
+        )
 
     return redirect('posts:post_detail', post_id=post_id)
 
@@ -130,18 +243,17 @@ def add_comment(request, post_id):
 def follow_index(request):
     """Публикации избранных авторов"""
 
-    posts = Post.objects.filter(author__following__user=request.user)
-
-    if posts.exists():
-        page_obj = paginator_custom(request, posts)
-        context = {
-            'page_obj': page_obj,
-        }
-    else:
-        empty_page = paginator_custom(request, [])
-        context = {
-            'page_obj': empty_page,
-        }
+    posts = timeline_posts(request.user)
+    page_obj = paginator_custom(
+        request,
+        posts,
+        cursor=True,
+        key='feed_created',
+    )
+
+    context = {
+        'page_obj': page_obj,
+    }
 
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,98 @@
+"""ModelBackend с пользователем сессии из кеша.
+
+AuthenticationMiddleware на каждом запросе вошедшего пользователя
+вызывает get_user(): здесь он читает пользователя из общего кеша,
+а не из таблицы auth_user. Кешированная запись помечена версией
+пользователя; любое сохранение или удаление пользователя (смена
+пароля, правка профиля, отключение, вход) увеличивает версию
+(users/signals.py), и запись со старой версией больше не
+используется. Проверка пароля (authenticate) идёт в базу как обычно.
+
+В кеше только поля CACHED_FIELDS и хеш сессии (HMAC от хеша пароля
+с SECRET_KEY), но не сам хеш пароля: остальные поля отложены
+и загрузятся из базы, если к ним обратятся.
+"""
+
+import time
+import types
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+USER_KEY = 'auth:user:{}'
+VERSION_KEY = 'auth:user:version:{}'
+CACHED_FIELDS = (
+    'id', 'username', 'is_active', 'is_staff', 'is_superuser', 'last_login',
+)
+
+
+def invalidate(user_id):
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def get_session_auth_hash(user):
+    """Хеш сессии из кеша, пока пароль не загружен (или не сменён)."""
+
+    if 'password' in user.__dict__:
+        return type(user).get_session_auth_hash(user)
+    return user._cached_session_auth_hash
+
+
+def cached_fields(model):
+    # from_db ждёт значения в порядке полей модели.
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in CACHED_FIELDS
+    ]
+
+
+def dump_user(user):
+    return (
+        tuple(getattr(user, name) for name in cached_fields(type(user))),
+        user.get_session_auth_hash(),
+    )
+
+
+def load_user(values, session_hash):
+    model = get_user_model()
+    user = model.from_db(
+        router.db_for_read(model), cached_fields(model), values,
+    )
+    user._cached_session_auth_hash = session_hash
+    user.get_session_auth_hash = types.MethodType(get_session_auth_hash, user)
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user_key = USER_KEY.format(user_id)
+        version_key = VERSION_KEY.format(user_id)
+        found = cache.get_many([user_key, version_key])
+        version = found.get(version_key)
+        if version is None:
+            # Стартуем с текущего времени: после вытеснения ключа номер
+            # не откатится к уже использованному.
+            cache.add(version_key, time.time_ns(), None)
+            version = cache.get(version_key)
+
+        cached = found.get(user_key)
+        if cached is not None and cached[0] == version:
+            user = load_user(*cached[1:])
+        else:
+            # Версия прочитана до пользователя: если его изменят
+            # между чтениями, запись получит уже устаревшую версию.
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(
+                user_key, (version, *dump_user(user)),
+                settings.AUTH_USER_CACHE_TIMEOUT,
+            )
+        return user if self.user_can_authenticate(user) else None
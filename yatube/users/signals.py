@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate(instance.pk)
+    # Запрос, прочитавший пользователя до коммита, мог закешировать
+    # старые данные с новой версией.
+    transaction.on_commit(lambda: invalidate(instance.pk))
@@ -0,0 +1,137 @@
+import pickle
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..backends import USER_KEY, CachedModelBackend
+
+User = get_user_model()
+
+
+class CachedModelBackendTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='reader', password='old-password',
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('posts:follow_index')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "auth_user"."id"')
+        ]
+
+    def test_user_cached(self):
+        """Пользователь сессии читается из базы один раз"""
+
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_hash_not_cached(self):
+        self.client.get(self.url)
+
+        cached = pickle.dumps(cache.get(USER_KEY.format(self.user.pk)))
+
+        self.assertNotIn(self.user.password.encode(), cached)
+
+    def test_session_hash_follows_new_password(self):
+        """Хеш сессии из кеша, пока пароль не задан заново"""
+
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        user = backend.get_user(self.user.pk)
+        self.assertNotIn('password', user.__dict__)
+        self.assertEqual(
+            (user.pk, user.username, user.is_active, user.is_staff),
+            (self.user.pk, 'reader', True, False),
+        )
+        self.assertEqual(
+            user.get_session_auth_hash(), self.user.get_session_auth_hash(),
+        )
+
+        user.set_password('new-password')
+
+        self.assertNotEqual(
+            user.get_session_auth_hash(), self.user.get_session_auth_hash(),
+        )
+        self.assertTrue(user.check_password('new-password'))
+
+    def test_post_create_without_lazy_loads(self):
+        """Создание и правка поста не дозагружают поля пользователя"""
+
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+            post = self.user.posts.get()
+            self.client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'Правка'},
+            )
+
+        self.assertEqual([
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "auth_user"."id"')
+        ], [])
+        self.assertEqual(self.user.posts.get().text, 'Правка')
+
+    def test_profile_edit(self):
+        self.client.get(self.url)
+        self.user.username = 'renamed'
+        self.user.save()
+
+        response, queries = self.user_queries()
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].username, 'renamed')
+
+    def test_password_change_logs_out(self):
+        self.client.get(self.url)
+        self.user.set_password('new-password')
+        self.user.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_deactivation_logs_out(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_stale_version_ignored(self):
+        """Запись с чужой версией не используется"""
+
+        self.client.get(self.url)
+        version, values, session_hash = cache.get(
+            USER_KEY.format(self.user.pk)
+        )
+        values = ('stale' if value == 'reader' else value for value in values)
+        cache.set(
+            USER_KEY.format(self.user.pk),
+            (version - 1, tuple(values), session_hash),
+        )
+
+        response, queries = self.user_queries()
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].username, 'reader')
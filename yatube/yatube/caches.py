@@ -0,0 +1,88 @@
+"""Настройки кеша из переменных окружения.
+
+CACHE_URL                общее для процессов хранилище (L2 кеша
+                         core.cache.tiered):
+                         sqlite:///путь - файл SQLite, по умолчанию
+                         в XDG_RUNTIME_DIR (или во временном каталоге);
+                         redis://хост:порт/номер_базы - сервер с
+                         протоколом Redis, для разработки его
+                         запускает manage.py cache_server;
+                         locmem:// - кеш только своего процесса,
+                         без L1 и L2
+CACHE_L1_MAX_ENTRIES     размер LRU в памяти процесса (L1), 0 - без L1
+CACHE_L1_CHECK_INTERVAL  как часто сверять значение из L1 с L2, секунды:
+                         столько L1 может отдавать значение, изменённое
+                         другим процессом
+CACHE_MAX_ENTRIES        сколько записей держит SQLite
+"""
+
+import hashlib
+import os
+import tempfile
+from urllib.parse import unquote, urlsplit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+L2_BACKENDS = {
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+    'redis': 'core.cache.resp.RespCache',
+}
+
+
+def default_url(environ):
+    """Файл кеша, доступный только своему пользователю.
+
+    XDG_RUNTIME_DIR - личный каталог в памяти; у каждой копии проекта
+    в нём свой файл. Без него файл лежит во временном каталоге системы,
+    а не в дереве проекта: каталог с именем пользователя создаётся
+    с правами 0700, чужой каталог SQLiteCache не примет.
+    """
+
+    project = hashlib.sha1(PROJECT_DIR.encode()).hexdigest()[:8]
+    runtime = environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        directory = os.path.join(runtime, f'yatube-{project}')
+    else:
+        directory = os.path.join(
+            tempfile.gettempdir(), f'yatube-{project}-{os.getuid()}',
+        )
+    return 'sqlite:///' + os.path.join(directory, 'cache.sqlite3')
+
+
+def caches(environ=os.environ):
+    url = environ.get('CACHE_URL') or default_url(environ)
+    scheme = urlsplit(url).scheme
+    if scheme == 'locmem':
+        return {
+            'default': {'BACKEND': 'core.backends.InstrumentedLocMemCache'},
+        }
+    if scheme not in L2_BACKENDS:
+        raise ValueError(f'Неизвестный кеш: {scheme}')
+
+    if scheme == 'sqlite':
+        # sqlite:////absolute/path.sqlite3
+        l2 = {
+            'BACKEND': L2_BACKENDS[scheme],
+            'LOCATION': unquote(urlsplit(url).path[1:]),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(
+                    environ.get('CACHE_MAX_ENTRIES') or 100_000
+                ),
+            },
+        }
+    else:
+        l2 = {'BACKEND': L2_BACKENDS[scheme], 'LOCATION': url}
+
+    return {
+        'default': {
+            'BACKEND': 'core.cache.tiered.TwoTierCache',
+            'OPTIONS': {
+                'L2': l2,
+                'L1_MAX_ENTRIES': int(
+                    environ.get('CACHE_L1_MAX_ENTRIES') or 1000
+                ),
+                'L1_CHECK_INTERVAL': float(
+                    environ.get('CACHE_L1_CHECK_INTERVAL') or 1
+                ),
+            },
+        }
+    }
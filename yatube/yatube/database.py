@@ -0,0 +1,91 @@
+"""Настройки баз данных из переменных окружения.
+
+DATABASE_URL               основная база: sqlite:///путь или
+                           postgres://пользователь:пароль@хост:порт/имя;
+                           по умолчанию SQLite в BASE_DIR/db.sqlite3
+DATABASE_REPLICA_URLS      реплики для чтения через запятую
+DATABASE_CONN_MAX_AGE      время жизни подключения, секунды; для
+                           PostgreSQL по умолчанию 60
+DATABASE_POOL_SIZE         размер пула подключений PostgreSQL
+                           (core/db/pool); с пулом подключения
+                           возвращаются в пул после каждого запроса;
+                           задавайте не меньше числа потоков процесса
+DATABASE_POOL_TIMEOUT      сколько секунд запрос ждёт свободного
+                           подключения пула, по умолчанию 30
+
+Для PostgreSQL нужен psycopg2 (для Django 2.2 - версии ниже 2.9).
+"""
+
+import os
+from urllib.parse import unquote, urlsplit
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+}
+POOL_ENGINE = 'core.db.pool'
+POSTGRES_CONN_MAX_AGE = 60
+
+
+def parse_url(url, conn_max_age=None, pool_size=None, pool_timeout=None):
+    """Словарь DATABASES для одной базы по URL."""
+
+    parts = urlsplit(url)
+    if parts.scheme not in ENGINES:
+        raise ValueError(f'Неизвестная база данных: {parts.scheme}')
+
+    if parts.scheme == 'sqlite':
+        # sqlite:///relative.db и sqlite:////absolute/path.db
+        return {
+            'ENGINE': ENGINES['sqlite'],
+            'NAME': unquote(parts.path[1:]) or ':memory:',
+            'CONN_MAX_AGE': conn_max_age or 0,
+        }
+
+    config = {
+        'ENGINE': ENGINES[parts.scheme],
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+        'CONN_MAX_AGE': (
+            POSTGRES_CONN_MAX_AGE if conn_max_age is None else conn_max_age
+        ),
+    }
+    if pool_size:
+        # Пул сам держит подключения открытыми.
+        config['ENGINE'] = POOL_ENGINE
+        config['CONN_MAX_AGE'] = 0
+        config['POOL'] = {'MIN_SIZE': 1, 'MAX_SIZE': pool_size}
+        if pool_timeout is not None:
+            config['POOL']['TIMEOUT'] = pool_timeout
+    return config
+
+
+def databases(base_dir, environ=os.environ):
+    """DATABASES и список псевдонимов реплик."""
+
+    conn_max_age = environ.get('DATABASE_CONN_MAX_AGE')
+    conn_max_age = int(conn_max_age) if conn_max_age else None
+    pool_size = int(environ.get('DATABASE_POOL_SIZE') or 0)
+    pool_timeout = environ.get('DATABASE_POOL_TIMEOUT')
+    pool = (pool_size, float(pool_timeout) if pool_timeout else None)
+
+    url = environ.get('DATABASE_URL') or (
+        'sqlite:///' + os.path.join(base_dir, 'db.sqlite3')
+    )
+    result = {'default': parse_url(url, conn_max_age, *pool)}
+
+    replicas = []
+    for number, replica_url in enumerate(
+        filter(None, environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1
+    ):
+        alias = f'replica{number}'
+        result[alias] = parse_url(replica_url.strip(), conn_max_age, *pool)
+        # В тестах реплика - та же база, что и основная.
+        result[alias]['TEST'] = {'MIRROR': 'default'}
+        replicas.append(alias)
+
+    return result, replicas
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from .caches import caches
+from .database import databases
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -46,10 +49,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryTraceMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +64,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -64,7 +72,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.ProfiledDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,13 +92,43 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+# Базы задаются переменными окружения (см. yatube/database.py),
+# по умолчанию - SQLite в BASE_DIR.
+
+DATABASES, DATABASE_REPLICAS = databases(BASE_DIR)
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Чтение с реплик (см. core/routers.py): реплики, отставшие больше
+# REPLICA_MAX_LAG секунд, не используются; посетитель после записи
+# читает только из реплик, догнавших его запись, но не дольше
+# REPLICA_PIN_SECONDS.
+REPLICA_MAX_LAG = 30
+REPLICA_PIN_SECONDS = 60
+REPLICA_LAG_CHECK_INTERVAL = 1
+
+# Сессии (см. core/sessions): SESSION_MODE из окружения выбирает
+# хранилище - db, cached_db (по умолчанию) или signed_cookies.
+# Несуществующую сессию cached_db помнит SESSION_MISSING_TIMEOUT секунд;
+# clearsessions удаляет просроченные пачками по
+# SESSION_CLEANUP_BATCH_SIZE с паузой SESSION_CLEANUP_PAUSE секунд.
+SESSION_ENGINES = {
+    'db': 'core.sessions.db',
+    'cached_db': 'core.sessions.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_MODE = os.getenv('SESSION_MODE', 'cached_db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_MISSING_TIMEOUT = 5 * 60
+SESSION_CLEANUP_BATCH_SIZE = 1000
+SESSION_CLEANUP_PAUSE = 0.05
+
+# Пользователь сессии берётся из кеша (см. users/backends.py) не дольше
+# AUTH_USER_CACHE_TIMEOUT секунд. ModelBackend нужен сессиям, открытым
+# до появления кеша: в сессии записан путь бэкенда.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
 
 
 # Password validation
@@ -133,8 +171,18 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 TEST_MEDIA_ROOT = 'test_data'
 STATIC_URL = '/static/'
+STATIC_ROOT = os.getenv(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static')
+)
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# collectstatic добавляет к именам хеш содержимого и сжимает файлы
+# в .gz и .br (см. core/storage.py). При STATIC_SERVE статику отдаёт
+# сам Django (core/static.py): файлы с хешем - с кешированием навсегда,
+# прочие - на STATIC_MAX_AGE секунд.
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = os.getenv('STATIC_SERVE') == '1'
+STATIC_MAX_AGE = 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -146,13 +194,112 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # DISPLAY COUNT CONSTANTS
 POSTS_AMOUNT = 10
+COMMENTS_AMOUNT = 50
 POST_TEXT_SYMB_TO_DISPLAY_COUNT = 15
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        # 'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
-}
+# Страницы лент живут в кеше до изменения постов (см. posts/feed_cache.py),
+# таймаут лишь ограничивает устаревание непостовых данных, например
+# числа подписчиков автора в общей ленте.
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Сколько секунд прокси может отдавать анонимную страницу поста,
+# профиля или группы без перепроверки (см. posts/conditional.py).
+PAGE_PROXY_MAX_AGE = 60
+
+# Кеш целых страниц для анонимов (см. core/middleware.py). Вошедшим
+# пользователям страницы из PAGE_CACHE_PERSONAL_VIEWS отдаются из кеша
+# с подставленными фрагментами {% personal %}.
+PAGE_CACHE_VIEWS = ('posts:index', 'posts:group_list', 'posts:post_detail')
+PAGE_CACHE_PERSONAL_VIEWS = ('posts:index', 'posts:group_list')
+PAGE_CACHE_TIMEOUT = 5 * 60
+
+# Пересчёт страниц и лент из кеша одним запросом (см.
+# core/cache/stampede.py): остальные получают устаревшую версию,
+# которая хранится ещё STAMPEDE_STALE_TTL секунд после срока, или ждут
+# пересчитывающего не дольше STAMPEDE_WAIT секунд. STAMPEDE_BETA - насколько
+# рано вероятностно обновлять значение до срока (0 - не обновлять).
+STAMPEDE_BETA = 1
+STAMPEDE_STALE_TTL = 60
+STAMPEDE_LOCK_TIMEOUT = 10
+STAMPEDE_WAIT = 2
+
+# METRICS
+# Сбор числа и времени SQL-запросов, времени шаблонов и попаданий
+# в кеш по представлениям (см. core/metrics.py). Сводку видят сотрудники
+# на /metrics/, Prometheus читает /metrics/prometheus/ с заголовком
+# Authorization: Bearer METRICS_TOKEN.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == '1'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Трассировка SQL (см. core/querytrace.py): запросы дольше
+# QUERY_TRACE_SLOW_MS и повторённые в одном ответе больше
+# QUERY_TRACE_MAX_REPEATS раз (N+1) пишутся в лог, а в строгом
+# режиме вызывают ошибку.
+QUERY_TRACE_ENABLED = os.getenv('QUERY_TRACE_ENABLED') == '1'
+QUERY_TRACE_STRICT = False
+QUERY_TRACE_SLOW_MS = 100
+QUERY_TRACE_MAX_REPEATS = 1
+
+# Кеш общий для всех процессов сервера: LRU процесса перед файлом
+# SQLite в общей памяти или сервером Redis (см. yatube/caches.py,
+# core/cache). Тесты начинают с пустого кеша (core.runner).
+CACHES = caches()
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+#     }
+# }
+TEST_RUNNER = 'core.runner.DiscoverRunner'
+
+# THUMBNAILS
+# Миниатюры картинок постов создаются фоновым пулом потоков,
+# пока миниатюра не готова, выводится заглушка.
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+# Через сколько секунд заглушка снова ставит миниатюру в очередь.
+THUMBNAIL_RETRY_INTERVAL = 5 * 60
+# Варианты картинок для srcset. Форматы без поддержки в сборке Pillow
+# пропускаются, JPEG создаётся всегда.
+IMAGE_VARIANT_WIDTHS = (320, 640, 960, 1920)
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+IMAGE_VARIANT_RATIO = (960, 339)
+
+# IMAGE UPLOADS
+# Загрузки сразу пишутся на диск, сверх лимита не сохраняются
+# (см. posts/uploads.py).
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedUploadHandler']
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# API
+# Наибольший размер страницы ленты, который клиент может задать ?limit=.
+API_MAX_LIMIT = 50
+
+# SEARCH
+# Полнотекстовый поиск по постам (см. posts/search.py). None - бэкенд
+# по базе: FTS5 на SQLite, 'posts.search.LikeBackend' на остальных.
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND') or None
+SEARCH_MAX_RESULTS = 1000
+SEARCH_BATCH_SIZE = 500
+
+# COMMENTS
+# Запись комментариев пачками фоновым потоком (см. posts/comment_queue.py).
+# Принятые комментарии ждут в таблице PendingComment, автор видит их
+# на странице поста. COMMENT_PENDING_TIMEOUT - сколько после своего
+# комментария автор читает очередь на странице поста.
+COMMENT_QUEUE_ASYNC = os.getenv('COMMENT_QUEUE_ASYNC') == '1'
+COMMENT_BATCH_SIZE = 100
+COMMENT_FLUSH_INTERVAL = 0.5
+COMMENT_PENDING_TIMEOUT = 5 * 60
+
+# FOLLOW TIMELINE
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются при чтении ленты.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL_POSTS = 100
+TIMELINE_BATCH_SIZE = 500
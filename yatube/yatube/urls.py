@@ -14,11 +14,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core import static as core_static
+from core import views as core_views
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.permission_denied'
@@ -26,11 +31,25 @@ handler403 = 'core.views.permission_denied'
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('auth/', include('users.urls')),
+    path('metrics/', core_views.metrics, name='metrics'),
+    path(
+        'metrics/prometheus/',
+        core_views.metrics_prometheus,
+        name='metrics_prometheus',
+    ),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
 ]
 
+if settings.STATIC_SERVE:
+    urlpatterns.insert(0, re_path(
+        r'^{}(?P<path>.+)$'.format(re.escape(settings.STATIC_URL[1:])),
+        core_static.serve,
+        name='static',
+    ))
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT